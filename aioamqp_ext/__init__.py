@@ -3,10 +3,20 @@
 from aioamqp_ext.base import BaseAmqp
 from aioamqp_ext.base_producer import BaseProducer
 from aioamqp_ext.base_consumer import BaseConsumer
+from aioamqp_ext.profiling import MessageProfiler
+from aioamqp_ext.rate_limit import RateLimiter
+from aioamqp_ext.retry import RetryPolicy
+from aioamqp_ext.sharded_producer import ShardedProducer
+from aioamqp_ext.spool import DiskSpool
 
 
 __all__ = (
     'BaseAmqp',
     'BaseProducer',
     'BaseConsumer',
+    'MessageProfiler',
+    'RateLimiter',
+    'RetryPolicy',
+    'ShardedProducer',
+    'DiskSpool',
 )
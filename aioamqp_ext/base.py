@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from urllib.parse import parse_qs, urlparse
 
 import aioamqp
 
+from aioamqp_ext.health import DEFAULT_INTERVAL, DEFAULT_MAX_FAILURES, DEFAULT_TIMEOUT, HealthMonitor
 from aioamqp_ext.serializer import JSON, get_serializer
 
 __all__ = ('BaseAmqp',)
@@ -27,7 +29,8 @@ class BaseAmqp:
             queue=None,
             prefetch_count=DEFAULT_PREFETCH_COUNT,
             prefetch_size=DEFAULT_PREFETCH_SIZE,
-            serializer=JSON
+            serializer=JSON,
+            heartbeat=None
     ):
         self._url = url
         self._exchange = exchange
@@ -41,10 +44,17 @@ class BaseAmqp:
         self._channel = None
         self._protocol = None
         self._transport = None
+        self._health_monitor = None
         self.serializer = get_serializer(serializer)
 
+        if heartbeat is None:
+            heartbeat = parse_qs(urlparse(url).query).get('heartbeat', [None])[0]
+        self._connection_kwargs = {}
+        if heartbeat is not None:
+            self._connection_kwargs['heartbeat'] = int(heartbeat)
+
     async def connect(self):
-        self._transport, self._protocol = await aioamqp.from_url(self._url, loop=self._loop)
+        self._transport, self._protocol = await aioamqp.from_url(self._url, loop=self._loop, **self._connection_kwargs)
         self._channel = await self._protocol.channel()
 
     async def declare_exchange(self):
@@ -73,13 +83,35 @@ class BaseAmqp:
             connection_global=False
         )
 
+    def monitor_health(
+            self,
+            interval=DEFAULT_INTERVAL,
+            timeout=DEFAULT_TIMEOUT,
+            on_stall=None,
+            max_failures=DEFAULT_MAX_FAILURES
+    ):
+        if self._health_monitor is None:
+            self._health_monitor = HealthMonitor(
+                self, interval=interval, timeout=timeout, on_stall=on_stall, max_failures=max_failures
+            )
+            self._health_monitor.start()
+        return self._health_monitor
+
     async def close(self):
+        if self._health_monitor is not None:
+            self._health_monitor.stop()
+            self._health_monitor = None
+
         if self._protocol is not None and self._protocol.state == aioamqp.protocol.OPEN:
             await self._protocol.close()
 
         if self._transport is not None:
             self._transport.close()
 
+    async def wait_closed(self):
+        if self._protocol is not None:
+            await self._protocol.connection_closed.wait()
+
     @property
     def is_connected(self):
         return self._protocol is not None \
@@ -1,29 +1,69 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 
 from aioamqp_ext.base import BaseAmqp
+from aioamqp_ext.stream import MessageStream
+
+DEFAULT_DRAIN_TIMEOUT = 30
 
 logger = logging.getLogger(__file__)
 
 
 class BaseConsumer(BaseAmqp, ABC):
+    def __init__(self, *args, retry_policy=None, profiler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._retry_policy = retry_policy
+        self._profiler = profiler
+        self._consumer_tag = None
+        self._draining = False
+        self._in_flight = {}
+        self._idle = None
+        self._streams = set()
+
     async def _init_connection(self):
         await self.connect()
         await self.declare_exchange()
         await self.declare_queue()
         await self.bind_queue()
         await self.specify_basic_qos()
+        if self._retry_policy is not None:
+            await self._retry_policy.declare(self._channel, self._queue)
 
     async def on_message(self, channel, body, envelope, properties):
+        if self._draining:
+            await channel.basic_client_nack(delivery_tag=envelope.delivery_tag, requeue=True)
+            return
+
+        self._in_flight[envelope.delivery_tag] = channel
         try:
             data = self.deserialize_data(body)
-            await self.process_request(data)
+            if self._profiler is None:
+                await self.process_request(data)
+            else:
+                await self._profiler.run(self.process_request, data, body, envelope, properties)
         except Exception as e:
             logger.warning(e)
+            if self._retry_policy is not None:
+                await self._retry(channel, body, envelope, properties)
         finally:
-            await channel.basic_client_ack(delivery_tag=envelope.delivery_tag)
+            # A drain that hit its deadline has already requeued this delivery.
+            if self._in_flight.pop(envelope.delivery_tag, None) is not None:
+                await channel.basic_client_ack(delivery_tag=envelope.delivery_tag)
+            if not self._in_flight and self._idle is not None:
+                self._idle.set()
+
+    async def _retry(self, channel, body, envelope, properties):
+        try:
+            await self._retry_policy.republish(channel, self._queue, body, properties)
+        except Exception as e:
+            # Acking a message that was not republished would lose it.
+            logger.error('Failed to schedule a retry: %r', e)
+            if self._in_flight.pop(envelope.delivery_tag, None) is not None:
+                await channel.basic_client_nack(delivery_tag=envelope.delivery_tag, requeue=True)
 
     @abstractmethod
     async def process_request(self, data):
@@ -33,4 +73,65 @@ class BaseConsumer(BaseAmqp, ABC):
         if not self.is_connected:
             await self._init_connection()
 
+        self._draining = False
         await self._channel.basic_consume(self.on_message, queue_name=self._queue)
+        self._consumer_tag = self._channel.last_consumer_tag
+
+    def stream(self, queue=None, maxsize=None):
+        # Without prefetch_count the broker does not wait for the buffer, and a
+        # buffer smaller than the prefetch blocks frame reading while it is full.
+        if not self._prefetch_count:
+            raise ValueError('stream() needs a positive prefetch_count')
+        if maxsize is None:
+            maxsize = self._prefetch_count
+        if maxsize < self._prefetch_count:
+            raise ValueError('maxsize must not be less than prefetch_count ({})'.format(self._prefetch_count))
+
+        stream = MessageStream(self, queue or self._queue, maxsize)
+        self._streams.add(stream)
+        return stream
+
+    async def _close_streams(self, deadline):
+        loop = asyncio.get_event_loop()
+        for stream in list(self._streams):
+            try:
+                await asyncio.wait_for(stream.close(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                logger.warning('Closing a message stream timed out')
+
+    async def drain(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """Stop consuming, wait for in-flight messages and close the connection.
+
+        Deliveries whose processing does not finish within `timeout` seconds
+        are nacked with requeue, so the broker hands them to another consumer
+        right away instead of waiting for the connection to drop. Open streams
+        are closed, which requeues the messages in their buffers.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        self._draining = True
+
+        if self._consumer_tag is not None and self.is_connected:
+            try:
+                await asyncio.wait_for(self._channel.basic_cancel(self._consumer_tag), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                logger.warning('basic_cancel for %s timed out', self._consumer_tag)
+            self._consumer_tag = None
+
+        await self._close_streams(deadline)
+
+        if self._in_flight:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                logger.warning('%d message(s) still in flight after drain timeout', len(self._in_flight))
+            finally:
+                self._idle = None
+
+        in_flight, self._in_flight = self._in_flight, {}
+        if self.is_connected:
+            for delivery_tag, channel in in_flight.items():
+                await channel.basic_client_nack(delivery_tag=delivery_tag, requeue=True)
+
+        await self.close()
@@ -1,6 +1,19 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import logging
+
+import aioamqp
+from aioamqp import frame as amqp_frame
+
 from aioamqp_ext.base import BaseAmqp
+from aioamqp_ext.profiling import add_trace_headers
+from aioamqp_ext.publish_template import HAS_FRAME_ENCODER, PublishTemplate
+from aioamqp_ext.rate_limit import DEFAULT_PRIORITY
+
+DEFAULT_SPOOL_RETRY_INTERVAL = 5
+
+logger = logging.getLogger(__file__)
 
 
 class BaseProducer(BaseAmqp):
@@ -9,25 +22,135 @@ class BaseProducer(BaseAmqp):
 
     DEFAULT_PROPERTIES = dict(delivery_mode=PERSISTENT)
 
+    def __init__(
+            self,
+            *args,
+            spool=None,
+            spool_retry_interval=DEFAULT_SPOOL_RETRY_INTERVAL,
+            rate_limiter=None,
+            trace=False,
+            **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+
+        self._trace = trace
+        self._rate_limiter = rate_limiter
+        self._spool = spool
+        self._spool_retry_interval = spool_retry_interval
+        self._replay_task = None
+        self._replay_lock = None
+
     async def _init_connection(self):
         await self.connect()
         await self.declare_exchange()
+        # Messages left in the spool by a previous run.
+        if self._spool is not None and not self._spool.is_empty:
+            self._schedule_replay()
 
-    async def publish_message(self, payload=None, routing_key=None, properties=None, mandatory=False, immediate=False):
+    async def publish_message(
+            self,
+            payload=None,
+            routing_key=None,
+            properties=None,
+            mandatory=False,
+            immediate=False,
+            priority=DEFAULT_PRIORITY
+    ):
         if properties is None:
             properties = self.DEFAULT_PROPERTIES
 
         if routing_key is None:
             routing_key = self._routing_key
 
+        if self._trace:
+            properties = add_trace_headers(properties)
+
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire(routing_key, priority)
+
+        payload = self.serialize_data(payload)
+        if self._spool is None:
+            await self._publish(payload, routing_key, properties, mandatory, immediate)
+            return
+
+        # Keep the order: while anything is spooled, new messages queue up behind it.
+        if self._spool.is_empty:
+            try:
+                await self._publish(payload, routing_key, properties, mandatory, immediate)
+                return
+            except (aioamqp.AioamqpException, OSError) as e:
+                logger.warning('Publish failed, spooling to disk: %r', e)
+
+        # A spooled message that can not be published would block the spool for good.
+        self._check_publishable(payload, properties)
+        self._spool.append(payload, routing_key, properties)
+        self._schedule_replay()
+
+    @staticmethod
+    def _check_publishable(payload, properties):
+        """Raise the errors basic_publish would raise for this message."""
+        if not payload:
+            raise ValueError('Payload cannot be empty')
+        if HAS_FRAME_ENCODER:
+            amqp_frame.AmqpEncoder().write_message_properties(properties)
+
+    async def _publish(self, payload, routing_key, properties, mandatory=False, immediate=False):
         if not self.is_connected:
             await self._init_connection()
 
         await self._channel.basic_publish(
-            payload=self.serialize_data(payload),
+            payload=payload,
             exchange_name=self._exchange,
             routing_key=routing_key,
             properties=properties,
             mandatory=mandatory,
             immediate=immediate,
         )
+
+    def _schedule_replay(self):
+        if self._replay_task is None or self._replay_task.done():
+            self._replay_task = asyncio.ensure_future(self.replay_spool())
+
+    async def replay_spool(self):
+        # Created here to bind the lock to the running loop.
+        if self._replay_lock is None:
+            self._replay_lock = asyncio.Lock()
+
+        # Concurrent replays would publish the same records twice.
+        async with self._replay_lock:
+            while not self._spool.is_empty:
+                try:
+                    await self._spool.replay(self._replay_message)
+                except (aioamqp.AioamqpException, OSError) as e:
+                    logger.warning('Spool replay failed, retrying in %s seconds: %r', self._spool_retry_interval, e)
+                    await asyncio.sleep(self._spool_retry_interval)
+
+    async def _replay_message(self, payload, routing_key, properties):
+        try:
+            # Checked first, aioamqp writes the method frame before it encodes the properties.
+            self._check_publishable(payload, properties)
+            await self._publish(payload, routing_key, properties)
+        except (asyncio.CancelledError, aioamqp.AioamqpException, OSError):
+            raise
+        except Exception as e:
+            # Skipped, retrying it would block the spool for good.
+            logger.error('Dropping a spooled message that can not be published to %s: %r', routing_key, e)
+
+    async def close(self):
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
+
+        if self._spool is not None:
+            self._spool.close()
+
+        await super().close()
+
+    def template(self, routing_key=None, properties=None, mandatory=False, immediate=False):
+        if properties is None:
+            properties = self.DEFAULT_PROPERTIES
+
+        if routing_key is None:
+            routing_key = self._routing_key
+
+        return PublishTemplate(self, routing_key, properties, mandatory=mandatory, immediate=immediate)
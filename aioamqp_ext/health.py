@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+
+import aioamqp
+
+__all__ = ('HealthMonitor',)
+
+DEFAULT_INTERVAL = 10
+DEFAULT_TIMEOUT = 5
+DEFAULT_MAX_FAILURES = 3
+# Weight of the latest probe in average_rtt.
+RTT_SMOOTHING = 0.2
+
+logger = logging.getLogger(__file__)
+
+
+class HealthMonitor:
+    """Measure broker round-trip time and detect stalled connections.
+
+    Every `interval` seconds a basic.qos round trip is made on a dedicated
+    channel. After `max_failures` probes in a row fail or take longer than
+    `timeout`, the connection is considered stalled: `on_stall` is called,
+    or by default the transport is aborted so that the connection is
+    reported closed and gets re-established.
+
+    aioamqp awaits a consumer callback before it reads the next frame, so on
+    a consumer the round trip also includes the time of the message being
+    processed. A probe that times out while a delivery is in flight is
+    therefore not counted as a failure. A round trip that timed out is not
+    abandoned, aioamqp allows one basic.qos at a time per channel, so the
+    following probes keep waiting for it.
+    """
+
+    def __init__(
+            self,
+            amqp,
+            interval=DEFAULT_INTERVAL,
+            timeout=DEFAULT_TIMEOUT,
+            on_stall=None,
+            max_failures=DEFAULT_MAX_FAILURES
+    ):
+        self._amqp = amqp
+        self._interval = interval
+        self._timeout = timeout
+        self._on_stall = on_stall
+        self._max_failures = max_failures
+        self._consecutive_failures = 0
+
+        self._channel = None
+        self._protocol = None
+        self._task = None
+        self._round_trip = None
+        self._round_trip_protocol = None
+        self._round_trip_start = None
+
+        self.rtt = None
+        self.average_rtt = None
+        self.last_activity = None
+        self.stalled = False
+        self.failures = 0
+
+    @property
+    def stats(self):
+        protocol = self._amqp._protocol
+        return {
+            'rtt': self.rtt,
+            'average_rtt': self.average_rtt,
+            'last_activity': self.last_activity,
+            'stalled': self.stalled,
+            'failures': self.failures,
+            'heartbeat': getattr(protocol, 'server_heartbeat', None),
+        }
+
+    async def _probe_channel(self):
+        protocol = self._amqp._protocol
+        if self._channel is None or self._protocol is not protocol or not self._channel.is_open:
+            self._channel = await protocol.channel()
+            self._protocol = protocol
+        return self._channel
+
+    async def _qos_round_trip(self):
+        channel = await self._probe_channel()
+        await channel.basic_qos(prefetch_count=0, prefetch_size=0, connection_global=False)
+
+    def _cancel_round_trip(self):
+        if self._round_trip is not None:
+            self._round_trip.cancel()
+            self._round_trip = None
+
+    async def probe(self):
+        loop = asyncio.get_event_loop()
+        if self._round_trip_protocol is not self._amqp._protocol:
+            self._cancel_round_trip()
+        if self._round_trip is None:
+            self._round_trip = asyncio.ensure_future(self._qos_round_trip())
+            self._round_trip_protocol = self._amqp._protocol
+            self._round_trip_start = loop.time()
+
+        # Not cancelled on timeout: aioamqp would keep the basic.qos waiter
+        # and fail the next basic.qos on the channel with SynchronizationError.
+        round_trip = self._round_trip
+        done, _ = await asyncio.wait([round_trip], timeout=self._timeout)
+        if not done:
+            raise asyncio.TimeoutError()
+        self._round_trip = None
+        round_trip.result()
+
+        self.last_activity = loop.time()
+        self.rtt = self.last_activity - self._round_trip_start
+        if self.average_rtt is None:
+            self.average_rtt = self.rtt
+        else:
+            self.average_rtt += RTT_SMOOTHING * (self.rtt - self.average_rtt)
+        self.stalled = False
+        self._consecutive_failures = 0
+        return self.rtt
+
+    async def _failed(self, error):
+        if isinstance(error, asyncio.TimeoutError) and getattr(self._amqp, '_in_flight', None):
+            logger.info('Health probe timed out while a message is being processed')
+            return
+
+        self.failures += 1
+        self._consecutive_failures += 1
+        logger.warning('Health probe failed (%d in a row): %r', self._consecutive_failures, error)
+        if self._consecutive_failures >= self._max_failures:
+            self._consecutive_failures = 0
+            await self._stall(error)
+
+    async def _stall(self, error):
+        self.stalled = True
+        logger.warning('AMQP connection stalled: %r', error)
+
+        if self._on_stall is not None:
+            await self._on_stall(self)
+        elif self._amqp._transport is not None:
+            self._amqp._transport.abort()
+
+    async def _run(self):
+        while True:
+            if self._amqp.is_connected:
+                try:
+                    await self.probe()
+                except (asyncio.TimeoutError, aioamqp.AioamqpException, OSError) as e:
+                    await self._failed(e)
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._cancel_round_trip()
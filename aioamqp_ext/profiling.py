@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import bisect
+import cProfile
+import logging
+import pstats
+import random
+import time
+import uuid
+
+__all__ = ('LatencyHistogram', 'MessageProfiler', 'add_trace_headers')
+
+DEFAULT_SLOW_THRESHOLD = 1
+DEFAULT_SAMPLE_RATE = 0
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+TRACE_ID_HEADER = 'x-trace-id'
+# Sent as a string, aioamqp can not encode float header values.
+PUBLISHED_AT_HEADER = 'x-published-at'
+
+logger = logging.getLogger(__file__)
+
+
+def add_trace_headers(properties):
+    headers = dict(properties.get('headers') or {})
+    headers.setdefault(TRACE_ID_HEADER, uuid.uuid4().hex)
+    headers[PUBLISHED_AT_HEADER] = repr(time.time())
+
+    return dict(properties, headers=headers)
+
+
+def properties_dict(properties):
+    names = getattr(properties, '__slots__', ())
+    return {name: getattr(properties, name) for name in names if getattr(properties, name) is not None}
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile."""
+        threshold = self.count * percent / 100
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return min(bucket, self.max)
+        return 0
+
+
+class MessageProfiler:
+    """Latency statistics, slow message log and sampled profiling of a consumer.
+
+    `sample_rate` is the share of deliveries (0..1) run under a profiler made
+    by `profiler_factory`; it must have enable() and disable() and be
+    accepted by pstats.Stats, like cProfile.Profile. Other coroutines running
+    while a sampled message is awaited are profiled too. Only one message is
+    sampled at a time, and a message whose profiler can not be enabled, e.g.
+    because another profiler is active, runs unsampled.
+    """
+
+    # Shared by all instances: a process can run one cProfile at a time.
+    _sampling = False
+
+    def __init__(
+            self,
+            slow_threshold=DEFAULT_SLOW_THRESHOLD,
+            sample_rate=DEFAULT_SAMPLE_RATE,
+            profiler_factory=cProfile.Profile
+    ):
+        self._slow_threshold = slow_threshold
+        self._sample_rate = sample_rate
+        self._profiler_factory = profiler_factory
+
+        self.latencies = {}
+        self.queue_delays = {}
+        self.profile_stats = None
+
+    @staticmethod
+    def _histogram(histograms, routing_key):
+        histogram = histograms.get(routing_key)
+        if histogram is None:
+            histogram = histograms[routing_key] = LatencyHistogram()
+        return histogram
+
+    def _record_queue_delay(self, routing_key, properties):
+        headers = getattr(properties, 'headers', None) or {}
+        published_at = headers.get(PUBLISHED_AT_HEADER)
+        if published_at is not None:
+            try:
+                delay = time.time() - float(published_at)
+            except (TypeError, ValueError):
+                return
+            self._histogram(self.queue_delays, routing_key).record(max(delay, 0))
+
+    def _log_slow(self, elapsed, body, envelope, properties):
+        headers = getattr(properties, 'headers', None) or {}
+        logger.warning(
+            'Slow message: %.3fs routing_key=%s size=%d trace_id=%s properties=%r',
+            elapsed,
+            envelope.routing_key,
+            len(body),
+            headers.get(TRACE_ID_HEADER),
+            properties_dict(properties),
+        )
+
+    def _add_profile(self, profiler):
+        if self.profile_stats is None:
+            self.profile_stats = pstats.Stats(profiler)
+        else:
+            self.profile_stats.add(profiler)
+
+    async def run(self, handler, data, body, envelope, properties):
+        self._record_queue_delay(envelope.routing_key, properties)
+
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+
+        profiler = None
+        if self._sample_rate and not MessageProfiler._sampling and random.random() < self._sample_rate:
+            profiler = self._profiler_factory()
+            try:
+                profiler.enable()
+            except Exception as e:
+                logger.warning('Could not enable the profiler: %r', e)
+                profiler = None
+            else:
+                MessageProfiler._sampling = True
+
+        try:
+            await handler(data)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                MessageProfiler._sampling = False
+                self._add_profile(profiler)
+
+            elapsed = loop.time() - start
+            self._histogram(self.latencies, envelope.routing_key).record(elapsed)
+            if elapsed >= self._slow_threshold:
+                self._log_slow(elapsed, body, envelope, properties)
+
+    def dump_stats(self, path):
+        if self.profile_stats is not None:
+            self.profile_stats.dump_stats(path)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import struct
+
+from aioamqp import constants as amqp_constants
+from aioamqp import exceptions as amqp_exceptions
+from aioamqp import frame as amqp_frame
+
+from aioamqp_ext.rate_limit import DEFAULT_PRIORITY
+
+__all__ = ('PublishTemplate',)
+
+FRAME_HEADER = struct.Struct('!BHI')
+BODY_SIZE = struct.Struct('!Q')
+FRAME_END = amqp_constants.FRAME_END
+# frame_max negotiated with the broker includes the frame header and the frame end octet
+FRAME_OVERHEAD = FRAME_HEADER.size + len(FRAME_END)
+
+# aioamqp started to encode frames with pamqp in 0.11, there is no encoder to reuse there.
+HAS_FRAME_ENCODER = hasattr(amqp_frame, 'AmqpEncoder')
+
+
+class PublishTemplate:
+    """Publish to a fixed exchange and routing key with fixed properties.
+
+    The method frame and the content header frame are encoded once per
+    channel, so a publish only serializes the payload and patches its size
+    into the content header.
+
+    The pre-encoded frames are written with aioamqp 0.10 internals. Newer
+    aioamqp releases have no frame encoder to reuse, there a template falls
+    back to plain basic_publish with its fixed arguments.
+    """
+
+    def __init__(self, producer, routing_key, properties, mandatory=False, immediate=False):
+        self._producer = producer
+        self.routing_key = routing_key
+        self.properties = properties
+        self.mandatory = mandatory
+        self.immediate = immediate
+
+        self._channel = None
+        self._method_frame = None
+        self._header_prefix = None
+        self._header_suffix = None
+
+    def _encode(self, channel):
+        method = amqp_frame.AmqpEncoder()
+        method.write_short(amqp_constants.CLASS_BASIC)
+        method.write_short(amqp_constants.BASIC_PUBLISH)
+        method.write_short(0)
+        method.write_shortstr(self._producer._exchange)
+        method.write_shortstr(self.routing_key)
+        method.write_bits(self.mandatory, self.immediate)
+        method_payload = method.payload.getvalue()
+
+        header = amqp_frame.AmqpEncoder()
+        header.write_message_properties(self.properties)
+        header_payload = header.payload.getvalue()
+        # class id (H), weight (H), body size (Q) and the encoded properties
+        header_size = 2 + 2 + BODY_SIZE.size + len(header_payload)
+
+        self._method_frame = b''.join((
+            FRAME_HEADER.pack(amqp_constants.TYPE_METHOD, channel.channel_id, len(method_payload)),
+            method_payload,
+            FRAME_END,
+        ))
+        self._header_prefix = b''.join((
+            FRAME_HEADER.pack(amqp_constants.TYPE_HEADER, channel.channel_id, header_size),
+            struct.pack('!HH', amqp_constants.CLASS_BASIC, 0),
+        ))
+        self._header_suffix = header_payload + FRAME_END
+        self._channel = channel
+
+    def encode_message(self, channel, payload):
+        if channel is not self._channel:
+            self._encode(channel)
+
+        frames = [self._method_frame, self._header_prefix, BODY_SIZE.pack(len(payload)), self._header_suffix]
+        server_frame_max = channel.protocol.server_frame_max
+        chunk_size = server_frame_max - FRAME_OVERHEAD if server_frame_max else len(payload)
+        for start in range(0, len(payload), chunk_size):
+            chunk = payload[start:start + chunk_size]
+            frames.append(FRAME_HEADER.pack(amqp_constants.TYPE_BODY, channel.channel_id, len(chunk)))
+            frames.append(chunk)
+            frames.append(FRAME_END)
+
+        return b''.join(frames)
+
+    async def publish(self, payload=None, priority=DEFAULT_PRIORITY):
+        producer = self._producer
+        if producer._spool is not None or producer._trace:
+            # Spooling and per-message trace headers are handled by publish_message.
+            await producer.publish_message(
+                payload, self.routing_key, self.properties, self.mandatory, self.immediate, priority
+            )
+            return
+
+        if producer._rate_limiter is not None:
+            await producer._rate_limiter.acquire(self.routing_key, priority)
+
+        if not producer.is_connected:
+            await producer._init_connection()
+
+        body = producer.serialize_data(payload)
+        channel = producer._channel
+        if not HAS_FRAME_ENCODER:
+            await channel.basic_publish(
+                payload=body,
+                exchange_name=producer._exchange,
+                routing_key=self.routing_key,
+                properties=self.properties,
+                mandatory=self.mandatory,
+                immediate=self.immediate,
+            )
+            return
+
+        if isinstance(body, str):
+            body = body.encode()
+        if not body:
+            raise ValueError('Payload cannot be empty')
+
+        protocol = channel.protocol
+        await protocol.ensure_open()
+        if not channel.is_open:
+            raise amqp_exceptions.ChannelClosed()
+
+        protocol._stream_writer.write(self.encode_message(channel, body))
+        await protocol._drain()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections import deque
+
+__all__ = ('RateLimiter', 'TokenBucket')
+
+DEFAULT_PRIORITY = 0
+# How often per-key buckets that are full again are dropped.
+KEY_BUCKET_SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1)
+
+        self._tokens = self.capacity
+        self._updated = None
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now):
+        self._refill(now)
+        return max(0, (1 - self._tokens) / self.rate)
+
+    def is_full(self, now):
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+    def take(self, now):
+        self._refill(now)
+        self._tokens -= 1
+
+
+class QueueStats:
+    def __init__(self):
+        self.count = 0
+        self.total_delay = 0
+        self.max_delay = 0
+
+    @property
+    def average_delay(self):
+        return self.total_delay / self.count if self.count else 0
+
+    def record(self, delay):
+        self.count += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+
+
+class RateLimiter:
+    """Token bucket rate limits with priority lanes.
+
+    `rate` limits all publishes, `key_rate` every routing key separately and
+    `key_rates` overrides the limit of specific routing keys. A waiting
+    publish with a higher priority is served first; publishes of the same
+    priority and routing key keep their order. Buckets made from `key_rate`
+    are dropped once full again, a full bucket is the same as a new one.
+    """
+
+    def __init__(self, rate=None, capacity=None, key_rate=None, key_capacity=None, key_rates=None):
+        self._bucket = TokenBucket(rate, capacity) if rate else None
+        self._key_rate = key_rate
+        self._key_capacity = key_capacity
+        self._key_rates = key_rates or {}
+        self._key_buckets = {key: TokenBucket(limit) for key, limit in self._key_rates.items()}
+        self._next_sweep = None
+
+        self._lanes = {}
+        self._dispatcher = None
+        self._wakeup = None
+        self.stats = {}
+
+    @property
+    def queued(self):
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _sweep(self, now):
+        for key, bucket in list(self._key_buckets.items()):
+            if key not in self._key_rates and bucket.is_full(now):
+                del self._key_buckets[key]
+        self._next_sweep = now + KEY_BUCKET_SWEEP_INTERVAL
+
+    def _key_bucket(self, routing_key, now):
+        if self._next_sweep is None:
+            self._next_sweep = now + KEY_BUCKET_SWEEP_INTERVAL
+        elif now >= self._next_sweep:
+            self._sweep(now)
+
+        bucket = self._key_buckets.get(routing_key)
+        if bucket is None and self._key_rate:
+            bucket = self._key_buckets[routing_key] = TokenBucket(self._key_rate, self._key_capacity)
+        return bucket
+
+    def _try_take(self, routing_key, now):
+        """Take tokens if both buckets have them, return the global and the key wait time otherwise."""
+        global_wait = self._bucket.wait_time(now) if self._bucket is not None else 0
+        key_bucket = self._key_bucket(routing_key, now)
+        key_wait = key_bucket.wait_time(now) if key_bucket is not None else 0
+        if global_wait <= 0 and key_wait <= 0:
+            if self._bucket is not None:
+                self._bucket.take(now)
+            if key_bucket is not None:
+                key_bucket.take(now)
+        return global_wait, key_wait
+
+    def _grant(self, now):
+        """Serve ready waiters by priority and return seconds until the next one may be ready."""
+        next_wait = None
+        for priority in sorted(self._lanes, reverse=True):
+            lane = self._lanes[priority]
+            for entry in list(lane):
+                routing_key, future = entry
+                if future.done():
+                    lane.remove(entry)
+                    continue
+
+                global_wait, key_wait = self._try_take(routing_key, now)
+                if global_wait > 0:
+                    return global_wait
+                if key_wait > 0:
+                    next_wait = key_wait if next_wait is None else min(next_wait, key_wait)
+                    continue
+
+                lane.remove(entry)
+                future.set_result(None)
+
+            if not lane:
+                del self._lanes[priority]
+        return next_wait
+
+    async def _dispatch(self):
+        loop = asyncio.get_event_loop()
+        while self._lanes:
+            self._wakeup.clear()
+            wait = self._grant(loop.time())
+            if not self._lanes:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        self._dispatcher = None
+
+    async def acquire(self, routing_key='', priority=DEFAULT_PRIORITY):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+
+        if not self._lanes and max(self._try_take(routing_key, start)) <= 0:
+            self._record(priority, 0)
+            return 0
+
+        future = loop.create_future()
+        self._lanes.setdefault(priority, deque()).append((routing_key, future))
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        else:
+            self._wakeup.set()
+
+        await future
+        delay = loop.time() - start
+        self._record(priority, delay)
+        return delay
+
+    def _record(self, priority, delay):
+        stats = self.stats.get(priority)
+        if stats is None:
+            stats = self.stats[priority] = QueueStats()
+        stats.record(delay)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ('RetryPolicy',)
+
+DEFAULT_INITIAL_DELAY = 1
+DEFAULT_MULTIPLIER = 4
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_HEADER = 'x-retry-attempt'
+
+# Broker managed headers which must not be copied into a republished message.
+SKIPPED_HEADERS = ('x-death', 'x-first-death-exchange', 'x-first-death-queue', 'x-first-death-reason')
+COPIED_PROPERTIES = (
+    'content_type',
+    'content_encoding',
+    'delivery_mode',
+    'priority',
+    'correlation_id',
+    'reply_to',
+    'message_id',
+    'timestamp',
+    'type',
+    'app_id',
+)
+
+
+class RetryPolicy:
+    """Delayed retries through per-delay retry queues and a final dead-letter queue.
+
+    A retry queue holds the message for its TTL and then dead-letters it back
+    to the consumer queue through the default exchange, so the retried message
+    does not reach other queues bound to the main exchange. Delays grow as
+    `initial_delay * multiplier ** attempt` unless explicit `delays` are given.
+    """
+
+    def __init__(
+            self,
+            delays=None,
+            initial_delay=DEFAULT_INITIAL_DELAY,
+            multiplier=DEFAULT_MULTIPLIER,
+            max_attempts=DEFAULT_MAX_ATTEMPTS,
+            header=DEFAULT_RETRY_HEADER
+    ):
+        if delays is None:
+            delays = [initial_delay * multiplier ** attempt for attempt in range(max_attempts)]
+
+        self.delays = list(delays)
+        self.header = header
+
+    @staticmethod
+    def retry_queue(queue, delay):
+        return '{}.retry.{}'.format(queue, int(delay * 1000))
+
+    @staticmethod
+    def dead_letter_queue(queue):
+        return '{}.dead'.format(queue)
+
+    async def declare(self, channel, queue):
+        for delay in sorted(set(self.delays)):
+            await channel.queue_declare(
+                queue_name=self.retry_queue(queue, delay),
+                durable=True,
+                arguments={
+                    'x-message-ttl': int(delay * 1000),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': queue,
+                }
+            )
+
+        await channel.queue_declare(queue_name=self.dead_letter_queue(queue), durable=True)
+
+    def get_attempt(self, properties):
+        headers = getattr(properties, 'headers', None) or {}
+        return int(headers.get(self.header, 0))
+
+    def get_properties(self, properties, attempt):
+        result = {
+            name: getattr(properties, name)
+            for name in COPIED_PROPERTIES
+            if getattr(properties, name, None) is not None
+        }
+        headers = getattr(properties, 'headers', None) or {}
+        result['headers'] = {key: value for key, value in headers.items() if key not in SKIPPED_HEADERS}
+        result['headers'][self.header] = attempt
+
+        return result
+
+    async def republish(self, channel, queue, body, properties):
+        attempt = self.get_attempt(properties)
+        if attempt < len(self.delays):
+            routing_key = self.retry_queue(queue, self.delays[attempt])
+        else:
+            routing_key = self.dead_letter_queue(queue)
+
+        await channel.basic_publish(
+            payload=body,
+            exchange_name='',
+            routing_key=routing_key,
+            properties=self.get_properties(properties, attempt + 1),
+        )
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from aioamqp_ext.base_consumer import DEFAULT_DRAIN_TIMEOUT
+
+__all__ = ('ConsumerRunner', 'main')
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_RESTART_DELAY = 1
+SUPERVISE_INTERVAL = 0.5
+SHUTDOWN_GRACE = 5
+
+logger = logging.getLogger(__file__)
+
+
+def import_consumer(path):
+    separator = ':' if ':' in path else '.'
+    module_name, _, class_name = path.rpartition(separator)
+    if not module_name:
+        raise ImportError('Consumer path must look like "package.module:Class", got {}'.format(path))
+
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, class_name)
+    except AttributeError:
+        raise ImportError('Module {} has no attribute {}'.format(module_name, class_name))
+
+
+def load_config(path):
+    if path is None:
+        return {}
+
+    with open(path) as config_file:
+        return json.load(config_file)
+
+
+def install_uvloop():
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning('uvloop is not installed, falling back to the default event loop')
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def run_worker(consumer_class, config, drain_timeout=DEFAULT_DRAIN_TIMEOUT, use_uvloop=False):
+    # A forked worker inherits the ConsumerRunner.stop handlers of its parent.
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+
+    if use_uvloop:
+        install_uvloop()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    consumer = consumer_class(loop=loop, **config)
+    try:
+        loop.run_until_complete(consumer.consume())
+        done, pending = loop.run_until_complete(asyncio.wait(
+            [loop.create_task(stopping.wait()), loop.create_task(consumer.wait_closed())],
+            return_when=asyncio.FIRST_COMPLETED
+        ))
+        for task in pending:
+            task.cancel()
+
+        if not stopping.is_set():
+            logger.error('Worker %d lost its connection', os.getpid())
+            sys.exit(1)
+
+        loop.run_until_complete(consumer.drain(timeout=drain_timeout))
+    finally:
+        loop.close()
+
+
+class ConsumerRunner:
+    def __init__(
+            self,
+            consumer_class,
+            config=None,
+            workers=DEFAULT_WORKERS,
+            drain_timeout=DEFAULT_DRAIN_TIMEOUT,
+            use_uvloop=False,
+            restart_delay=DEFAULT_RESTART_DELAY
+    ):
+        self._consumer_class = consumer_class
+        self._config = config or {}
+        self._workers = workers
+        self._drain_timeout = drain_timeout
+        self._use_uvloop = use_uvloop
+        self._restart_delay = restart_delay
+
+        self._processes = [None] * workers
+        self._started_at = [0] * workers
+        self._stopping = False
+
+    def _spawn(self, index):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(self._consumer_class, self._config, self._drain_timeout, self._use_uvloop),
+            name='{}-{}'.format(self._consumer_class.__name__, index),
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info('Started worker %s (pid %d)', process.name, process.pid)
+
+    def supervise(self):
+        for index, process in enumerate(self._processes):
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                logger.warning('Worker %s exited with code %s', process.name, process.exitcode)
+                # Do not restart a worker that keeps crashing on startup in a tight loop.
+                if time.monotonic() - self._started_at[index] < self._restart_delay:
+                    continue
+
+            self._spawn(index)
+
+    def stop(self, signum=None, frame=None):
+        self._stopping = True
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    def join(self):
+        deadline = time.monotonic() + self._drain_timeout + SHUTDOWN_GRACE
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning('Worker %s did not drain in time, killing it', process.name)
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        while not self._stopping:
+            self.supervise()
+            time.sleep(SUPERVISE_INTERVAL)
+
+        self.join()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run a BaseConsumer subclass in several worker processes.')
+    parser.add_argument('consumer', help='consumer class path, e.g. "package.module:Consumer"')
+    parser.add_argument('--config', help='JSON file with consumer keyword arguments')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='number of worker processes')
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT,
+                        help='seconds to wait for in-flight messages on shutdown')
+    parser.add_argument('--uvloop', action='store_true', help='use uvloop when it is installed')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    runner = ConsumerRunner(
+        consumer_class=import_consumer(args.consumer),
+        config=load_config(args.config),
+        workers=args.workers,
+        drain_timeout=args.drain_timeout,
+        use_uvloop=args.uvloop,
+    )
+    runner.run()
+
+
+if __name__ == '__main__':
+    main()
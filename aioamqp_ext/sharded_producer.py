@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import bisect
+import itertools
+import logging
+import zlib
+
+import aioamqp
+
+from aioamqp_ext.base import DEFAULT_RABBIT_URL
+from aioamqp_ext.base_producer import BaseProducer
+from aioamqp_ext.rate_limit import DEFAULT_PRIORITY
+
+__all__ = (
+    'CONSISTENT_HASH',
+    'ROUND_ROBIN',
+    'ShardedProducer',
+    'ShardsUnavailableException',
+)
+
+CONSISTENT_HASH = 'consistent_hash'
+ROUND_ROBIN = 'round_robin'
+
+DEFAULT_CONNECTIONS_PER_URL = 1
+DEFAULT_VIRTUAL_NODES = 64
+DEFAULT_RETRY_INTERVAL = 5
+DEFAULT_PUBLISH_TIMEOUT = 10
+
+logger = logging.getLogger(__file__)
+
+
+class ShardsUnavailableException(Exception):
+    pass
+
+
+def hash_key(key):
+    return zlib.crc32(key.encode('utf-8'))
+
+
+class ShardedProducer:
+    """Spread publishes over several producer connections.
+
+    With `CONSISTENT_HASH` routing every routing key sticks to one shard, so
+    messages of the same key keep their order while that shard is healthy.
+    A shard that fails to publish is skipped for `retry_interval` seconds and
+    its messages go to the next shard on the ring, as does a shard that does
+    not publish within `publish_timeout` seconds. A publish that timed out
+    may still have reached the broker, so failover after a timeout is
+    at-least-once and can duplicate and reorder messages of that key.
+    """
+
+    def __init__(
+            self,
+            urls=(DEFAULT_RABBIT_URL,),
+            connections_per_url=DEFAULT_CONNECTIONS_PER_URL,
+            routing=CONSISTENT_HASH,
+            retry_interval=DEFAULT_RETRY_INTERVAL,
+            publish_timeout=DEFAULT_PUBLISH_TIMEOUT,
+            virtual_nodes=DEFAULT_VIRTUAL_NODES,
+            producer_class=BaseProducer,
+            **kwargs
+    ):
+        if routing not in (CONSISTENT_HASH, ROUND_ROBIN):
+            raise LookupError('Unknown routing: {}'.format(routing))
+        if kwargs.get('spool') is not None:
+            # Shards would replay and delete each other's segments.
+            raise ValueError('A spool can not be shared between shards')
+        if isinstance(urls, str):
+            urls = (urls,)
+
+        self._routing = routing
+        self._retry_interval = retry_interval
+        self._publish_timeout = publish_timeout
+        # Shared by all shards and taken once per message, outside of publish_timeout.
+        self._rate_limiter = kwargs.pop('rate_limiter', None)
+        self._routing_key = kwargs.get('routing_key', '')
+        self._shards = [
+            producer_class(url=url, **kwargs)
+            for url in urls
+            for _ in range(connections_per_url)
+        ]
+        self._down_until = [0] * len(self._shards)
+
+        ring = sorted(
+            (hash_key('{}#{}'.format(index, node)), index)
+            for index in range(len(self._shards))
+            for node in range(virtual_nodes)
+        )
+        self._ring_hashes = [point for point, _ in ring]
+        self._ring_shards = [index for _, index in ring]
+        self._counter = itertools.count()
+
+    @property
+    def shards(self):
+        return list(self._shards)
+
+    @property
+    def healthy_shards(self):
+        now = asyncio.get_event_loop().time()
+        return [shard for shard, down_until in zip(self._shards, self._down_until) if down_until <= now]
+
+    def _preference(self, routing_key):
+        if self._routing == ROUND_ROBIN:
+            start = next(self._counter)
+            return [(start + offset) % len(self._shards) for offset in range(len(self._shards))]
+
+        position = bisect.bisect(self._ring_hashes, hash_key(routing_key))
+        preference = []
+        for offset in range(len(self._ring_shards)):
+            index = self._ring_shards[(position + offset) % len(self._ring_shards)]
+            if index not in preference:
+                preference.append(index)
+                if len(preference) == len(self._shards):
+                    break
+        return preference
+
+    async def publish_message(
+            self,
+            payload=None,
+            routing_key=None,
+            properties=None,
+            mandatory=False,
+            immediate=False,
+            priority=DEFAULT_PRIORITY
+    ):
+        if routing_key is None:
+            routing_key = self._routing_key
+
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire(routing_key, priority)
+
+        now = asyncio.get_event_loop().time()
+        preference = self._preference(routing_key)
+        # Shards that are marked down are still tried as a last resort.
+        candidates = sorted(preference, key=lambda index: self._down_until[index] > now)
+
+        for index in candidates:
+            try:
+                await asyncio.wait_for(
+                    self._shards[index].publish_message(
+                        payload=payload,
+                        routing_key=routing_key,
+                        properties=properties,
+                        mandatory=mandatory,
+                        immediate=immediate,
+                        priority=priority,
+                    ),
+                    self._publish_timeout,
+                )
+            except (asyncio.TimeoutError, aioamqp.AioamqpException, OSError) as e:
+                logger.warning('Shard %d failed to publish: %r', index, e)
+                self._down_until[index] = asyncio.get_event_loop().time() + self._retry_interval
+            else:
+                self._down_until[index] = 0
+                return
+
+        raise ShardsUnavailableException('All {} shards failed to publish'.format(len(self._shards)))
+
+    async def close(self):
+        await asyncio.gather(*(shard.close() for shard in self._shards))
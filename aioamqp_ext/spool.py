@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+__all__ = ('DiskSpool', 'SpoolFullException')
+
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+SEGMENT_SUFFIX = '.spool'
+
+# meta length, payload length, crc32 of meta + payload
+RECORD_HEADER = struct.Struct('!III')
+# JSON has no bytes type, bytes header values are stored as {BYTES_TAG: base64}.
+BYTES_TAG = '__spool_bytes__'
+
+logger = logging.getLogger(__file__)
+
+
+class SpoolFullException(Exception):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, bytes):
+        return {BYTES_TAG: base64.b64encode(value).decode()}
+    raise TypeError('Can not spool a property value of type {}'.format(type(value).__name__))
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and BYTES_TAG in obj:
+        return base64.b64decode(obj[BYTES_TAG])
+    return obj
+
+
+class DiskSpool:
+    """Append-only on-disk queue of messages that could not be published.
+
+    Messages are appended to numbered segment files and replayed in order.
+    A segment is removed only after all its messages are published, so a
+    crash during replay may publish some of them twice.
+    """
+
+    def __init__(self, path, segment_size=DEFAULT_SEGMENT_SIZE, max_bytes=DEFAULT_MAX_BYTES, use_mmap=False,
+                 fsync=False):
+        self._path = path
+        self._segment_size = segment_size
+        self._max_bytes = max_bytes
+        self._use_mmap = use_mmap
+        self._fsync = fsync
+
+        self._writer = None
+        self._writer_number = None
+        self._sizes = {}
+        # Records already replayed from a segment, kept so that a retried replay skips them.
+        self._replayed = {}
+
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if name.endswith(SEGMENT_SUFFIX):
+                self._sizes[int(name[:-len(SEGMENT_SUFFIX)])] = os.path.getsize(os.path.join(path, name))
+
+    @property
+    def is_empty(self):
+        return not self._sizes
+
+    @property
+    def size(self):
+        return sum(self._sizes.values())
+
+    def _segment_path(self, number):
+        return os.path.join(self._path, '{:020d}{}'.format(number, SEGMENT_SUFFIX))
+
+    def _open_writer(self):
+        number = max(self._sizes, default=0) + 1
+        self._writer = open(self._segment_path(number), 'ab')
+        self._writer_number = number
+        self._sizes[number] = 0
+
+    def _seal(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def append(self, payload, routing_key, properties=None):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        meta = json.dumps({'routing_key': routing_key, 'properties': properties}, default=_encode_value).encode()
+        record = RECORD_HEADER.pack(len(meta), len(payload), zlib.crc32(meta + payload)) + meta + payload
+
+        if self.size + len(record) > self._max_bytes:
+            raise SpoolFullException('Spool {} is over {} bytes'.format(self._path, self._max_bytes))
+
+        if self._writer is None or self._sizes[self._writer_number] >= self._segment_size:
+            self._seal()
+            self._open_writer()
+
+        self._writer.write(record)
+        self._writer.flush()
+        if self._fsync:
+            os.fsync(self._writer.fileno())
+        self._sizes[self._writer_number] += len(record)
+
+    def _read_segment(self, number):
+        with open(self._segment_path(number), 'rb') as segment:
+            if self._use_mmap and self._sizes[number]:
+                with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    yield from self._parse(number, data)
+            else:
+                yield from self._parse(number, segment.read())
+
+    @staticmethod
+    def _parse(number, data):
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            meta_size, payload_size, checksum = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            end = start + meta_size + payload_size
+            body = bytes(data[start:end])
+            if len(body) < meta_size + payload_size or zlib.crc32(body) != checksum:
+                # A record torn by a crash while it was being written.
+                logger.warning('Skipping a broken record at %d in spool segment %d', offset, number)
+                return
+
+            meta = json.loads(body[:meta_size].decode(), object_hook=_decode_object)
+            yield body[meta_size:], meta['routing_key'], meta['properties']
+            offset = end
+
+    async def replay(self, publish):
+        """Publish every spooled message with `publish(payload, routing_key, properties)`."""
+        self._seal()
+        for number in sorted(self._sizes):
+            records = self._read_segment(number)
+            try:
+                for _ in range(self._replayed.get(number, 0)):
+                    next(records, None)
+
+                for payload, routing_key, properties in records:
+                    await publish(payload, routing_key, properties)
+                    self._replayed[number] = self._replayed.get(number, 0) + 1
+            finally:
+                records.close()
+
+            os.remove(self._segment_path(number))
+            del self._sizes[number]
+            self._replayed.pop(number, None)
+
+    def close(self):
+        self._seal()
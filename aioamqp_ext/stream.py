@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+
+__all__ = ('Message', 'MessageStream')
+
+logger = logging.getLogger(__file__)
+
+_STOP = object()
+
+
+class Message:
+    def __init__(self, channel, body, envelope, properties, data):
+        self.channel = channel
+        self.body = body
+        self.envelope = envelope
+        self.properties = properties
+        self.data = data
+        self.settled = False
+
+    @property
+    def routing_key(self):
+        return self.envelope.routing_key
+
+    async def ack(self):
+        if not self.settled:
+            self.settled = True
+            await self.channel.basic_client_ack(delivery_tag=self.envelope.delivery_tag)
+
+    async def nack(self, requeue=True):
+        if not self.settled:
+            self.settled = True
+            await self.channel.basic_client_nack(delivery_tag=self.envelope.delivery_tag, requeue=requeue)
+
+
+class MessageStream:
+    """Async iterator over the messages of a queue.
+
+    The buffer is bounded, and with a matching prefetch_count the broker
+    stops sending new deliveries until buffered messages are acked or nacked.
+    Messages still buffered on close are nacked with requeue.
+    """
+
+    def __init__(self, consumer, queue, maxsize):
+        self._consumer = consumer
+        self._queue_name = queue
+        self._maxsize = maxsize
+        self._buffer = None
+        self._consumer_tag = None
+        self._closed = False
+
+    async def start(self):
+        # Created here to bind the buffer to the running loop.
+        self._buffer = asyncio.Queue(maxsize=self._maxsize)
+
+        consumer = self._consumer
+        if not consumer.is_connected:
+            await consumer._init_connection()
+
+        await consumer._channel.basic_consume(self.on_message, queue_name=self._queue_name)
+        self._consumer_tag = consumer._channel.last_consumer_tag
+
+    async def on_message(self, channel, body, envelope, properties):
+        if self._closed:
+            # Delivered between basic.cancel and cancel-ok.
+            await channel.basic_client_nack(delivery_tag=envelope.delivery_tag, requeue=True)
+            return
+
+        try:
+            data = self._consumer.deserialize_data(body)
+        except Exception as e:
+            logger.warning(e)
+            await channel.basic_client_ack(delivery_tag=envelope.delivery_tag)
+            return
+
+        message = Message(channel, body, envelope, properties, data)
+        await self._buffer.put(message)
+        if self._closed and self._consumer.is_connected:
+            # The stream was closed while waiting for room in the buffer.
+            await message.nack(requeue=True)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._buffer is None:
+            if self._closed:
+                raise StopAsyncIteration
+            await self.start()
+
+        if self._closed and self._buffer.empty():
+            raise StopAsyncIteration
+
+        message = await self._buffer.get()
+        if message is _STOP:
+            raise StopAsyncIteration
+        return message
+
+    def pipe(self, *stages):
+        """Chain stages, each one a callable taking and returning an async iterable."""
+        iterable = self
+        for stage in stages:
+            iterable = stage(iterable)
+        return iterable
+
+    async def _requeue_buffered(self):
+        while not self._buffer.empty():
+            message = self._buffer.get_nowait()
+            if message is not _STOP and self._consumer.is_connected:
+                await message.nack(requeue=True)
+
+    async def close(self):
+        self._closed = True
+        self._consumer._streams.discard(self)
+        if self._buffer is not None:
+            # Also unblocks an on_message waiting on a full buffer, which holds up cancel-ok.
+            await self._requeue_buffered()
+
+        if self._consumer_tag is not None and self._consumer.is_connected:
+            await self._consumer._channel.basic_cancel(self._consumer_tag)
+        self._consumer_tag = None
+
+        if self._buffer is not None:
+            await self._requeue_buffered()
+            # Wake up a reader waiting on the empty buffer.
+            self._buffer.put_nowait(_STOP)
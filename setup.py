@@ -37,6 +37,14 @@ setup(
         'aioamqp>=0.9.0',
         'msgpack-python',
     ],
+    extras_require={
+        'uvloop': ['uvloop'],
+    },
+    entry_points={
+        'console_scripts': [
+            'aioamqp-ext-runner = aioamqp_ext.runner:main',
+        ],
+    },
     classifiers=[
         'Programming Language :: Python',
         'Programming Language :: Python :: 3.5',
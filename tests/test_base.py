@@ -57,6 +57,17 @@ class TestBaseAmqpInit:
 
         assert isinstance(amqp_obj.serializer, serializer)
 
+    @pytest.mark.parametrize('url, heartbeat, expected', [
+        ('amqp://localhost:5672/', None, {}),
+        ('amqp://localhost:5672/?heartbeat=30', None, {'heartbeat': 30}),
+        ('amqp://localhost:5672/?heartbeat=30', 10, {'heartbeat': 10}),
+        ('amqp://localhost:5672/', 0, {'heartbeat': 0}),
+    ])
+    def test_ok_heartbeat(self, url, heartbeat, expected):
+        amqp_obj = BaseAmqp(url=url, heartbeat=heartbeat)
+
+        assert amqp_obj._connection_kwargs == expected
+
     def test_error_unknown_serializer(self):
         with pytest.raises(LookupError):
             BaseAmqp(serializer='unknown')
@@ -80,6 +91,18 @@ class TestBaseAmqpConnect:
         assert amqp._transport == fake_transport
         assert amqp._protocol == fake_protocol
 
+    @pytest.mark.asyncio
+    async def test_ok_heartbeat(self, mocker: MockFixture):
+        amqp = BaseAmqp(heartbeat=30)
+        mocked_from_url = mocker.patch(
+            'aioamqp.from_url',
+            CoroutineMock(return_value=(mocker.Mock(), CoroutineMock()))
+        )
+
+        await amqp.connect()
+
+        mocked_from_url.assert_called_once_with(amqp._url, loop=amqp._loop, heartbeat=30)
+
 
 class TestBaseAmqpBasic:
     @staticmethod
@@ -167,6 +190,43 @@ class TestBaseAmqpClose:
             amqp._transport.close()
 
 
+class TestBaseAmqpMonitorHealth:
+    def test_ok(self, amqp: BaseAmqp, mocker: MockFixture):
+        mocked_monitor = mocker.patch('aioamqp_ext.base.HealthMonitor')
+
+        monitor = amqp.monitor_health(interval=1, timeout=2)
+
+        assert monitor is amqp.monitor_health()
+        mocked_monitor.assert_called_once_with(amqp, interval=1, timeout=2, on_stall=None, max_failures=3)
+        monitor.start.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_stopped_on_close(self, amqp: BaseAmqp, mocker: MockFixture):
+        fake_monitor = mocker.Mock()
+        mocker.patch.object(amqp, '_health_monitor', fake_monitor)
+
+        await amqp.close()
+
+        fake_monitor.stop.assert_called_once_with()
+        assert amqp._health_monitor is None
+
+
+class TestBaseAmqpWaitClosed:
+    @pytest.mark.asyncio
+    async def test_ok(self, amqp: BaseAmqp, mocker: MockFixture):
+        mocker.patch.object(amqp, '_protocol', mocker.Mock(connection_closed=CoroutineMock()))
+
+        await amqp.wait_closed()
+
+        amqp._protocol.connection_closed.wait.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_wo_protocol(self, amqp: BaseAmqp, mocker: MockFixture):
+        mocker.patch.object(amqp, '_protocol', None)
+
+        await amqp.wait_closed()
+
+
 class TestBaseAmqpIsConnected:
     def test_ok_is_connected(self, amqp: BaseAmqp, mocker: MockFixture):
         mocker.patch.object(amqp, '_protocol', CoroutineMock(
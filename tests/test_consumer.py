@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+
 import pytest
 from asynctest import CoroutineMock
 from pytest_mock import MockFixture
@@ -74,3 +76,226 @@ class TestBaseConsumer:
         consumer.deserialize_data.assert_called_once_with(fake_body)
         consumer.process_request.assert_called_once_with(consumer.deserialize_data.return_value)
         fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag)
+
+    @pytest.mark.asyncio
+    async def test_ok_on_message_draining(self, consumer, mocker: MockFixture):
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+        mocker.patch.object(consumer, '_draining', True)
+
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock()
+
+        await consumer.on_message(fake_channel, mocker.Mock(), fake_envelope, dict())
+
+        consumer.process_request.assert_not_called()
+        fake_channel.basic_client_ack.assert_not_called()
+        fake_channel.basic_client_nack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag, requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_ok_on_message_profiler(self, consumer, mocker: MockFixture):
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+        mocker.patch.object(consumer, '_profiler', CoroutineMock())
+
+        fake_body = mocker.Mock()
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock()
+        fake_properties = mocker.Mock()
+
+        await consumer.on_message(fake_channel, fake_body, fake_envelope, fake_properties)
+
+        consumer._profiler.run.assert_called_once_with(
+            consumer.process_request,
+            consumer.deserialize_data.return_value,
+            fake_body,
+            fake_envelope,
+            fake_properties
+        )
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag)
+
+    def test_ok_stream(self, consumer, mocker: MockFixture):
+        mocked_stream = mocker.patch('aioamqp_ext.base_consumer.MessageStream')
+        mocker.patch.object(consumer, '_prefetch_count', 2)
+
+        stream = consumer.stream()
+
+        mocked_stream.assert_called_once_with(consumer, consumer._queue, 2)
+        assert consumer._streams == {stream}
+
+    @pytest.mark.parametrize('prefetch_count, maxsize', [
+        (0, None),
+        (0, 10),
+        (2, 1),
+    ])
+    def test_error_stream_bound(self, consumer, mocker: MockFixture, prefetch_count, maxsize):
+        mocker.patch('aioamqp_ext.base_consumer.MessageStream')
+        mocker.patch.object(consumer, '_prefetch_count', prefetch_count)
+
+        with pytest.raises(ValueError):
+            consumer.stream(maxsize=maxsize)
+
+
+class TestBaseConsumerRetry:
+    @staticmethod
+    @pytest.fixture
+    def consumer(mocker: MockFixture):
+        BaseConsumer.__bases__ = (CoroutineMock,)
+
+        class Consumer(BaseConsumer):
+            process_request = CoroutineMock(side_effect=ValueError())
+
+        consumer = Consumer(retry_policy=CoroutineMock())
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+
+        return consumer
+
+    @pytest.mark.asyncio
+    async def test_ok_init_connection(self, consumer):
+        await consumer._init_connection()
+
+        consumer._retry_policy.declare.assert_called_once_with(consumer._channel, consumer._queue)
+
+    @pytest.mark.asyncio
+    async def test_ok_on_message_failed(self, consumer, mocker: MockFixture):
+        fake_body = mocker.Mock()
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock()
+        fake_properties = mocker.Mock()
+
+        await consumer.on_message(fake_channel, fake_body, fake_envelope, fake_properties)
+
+        consumer._retry_policy.republish.assert_called_once_with(
+            fake_channel, consumer._queue, fake_body, fake_properties
+        )
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag)
+        fake_channel.basic_client_nack.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_on_message_republish_failed(self, consumer, mocker: MockFixture):
+        consumer._retry_policy.republish.side_effect = OSError()
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock()
+
+        await consumer.on_message(fake_channel, mocker.Mock(), fake_envelope, mocker.Mock())
+
+        fake_channel.basic_client_ack.assert_not_called()
+        fake_channel.basic_client_nack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag, requeue=True)
+
+    @pytest.mark.asyncio
+    async def test_ok_on_message_succeeded(self, consumer, mocker: MockFixture):
+        consumer.process_request.side_effect = None
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock()
+
+        await consumer.on_message(fake_channel, mocker.Mock(), fake_envelope, mocker.Mock())
+
+        consumer._retry_policy.republish.assert_not_called()
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=fake_envelope.delivery_tag)
+
+
+class TestBaseConsumerDrain:
+    @staticmethod
+    @pytest.fixture
+    def consumer(mocker: MockFixture):
+        BaseConsumer.__bases__ = (CoroutineMock,)
+
+        class Consumer(BaseConsumer):
+            process_request = CoroutineMock()
+
+        consumer = Consumer()
+        mocker.patch.object(consumer, 'is_connected', True)
+        mocker.patch.object(consumer, '_consumer_tag', 'fake_tag')
+
+        return consumer
+
+    @pytest.mark.asyncio
+    async def test_ok_idle(self, consumer):
+        fake_channel = consumer._channel
+
+        await consumer.drain()
+
+        fake_channel.basic_cancel.assert_called_once_with('fake_tag')
+        fake_channel.basic_client_nack.assert_not_called()
+        consumer.close.assert_called_once_with()
+
+        assert consumer._draining
+        assert consumer._consumer_tag is None
+
+    @pytest.mark.asyncio
+    async def test_ok_waits_in_flight(self, consumer, mocker: MockFixture):
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock(delivery_tag=1)
+
+        async def process_request(data):
+            await asyncio.sleep(0.01)
+
+        mocker.patch.object(consumer, 'process_request', process_request)
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+
+        handler = asyncio.ensure_future(consumer.on_message(fake_channel, mocker.Mock(), fake_envelope, dict()))
+        await asyncio.sleep(0)
+        await consumer.drain(timeout=1)
+
+        assert handler.done()
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=1)
+        fake_channel.basic_client_nack.assert_not_called()
+        consumer.close.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_requeues_on_timeout(self, consumer, mocker: MockFixture):
+        fake_channel = CoroutineMock()
+        fake_envelope = mocker.Mock(delivery_tag=1)
+
+        async def process_request(data):
+            await asyncio.sleep(0.1)
+
+        mocker.patch.object(consumer, 'process_request', process_request)
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+
+        handler = asyncio.ensure_future(consumer.on_message(fake_channel, mocker.Mock(), fake_envelope, dict()))
+        await asyncio.sleep(0)
+        await consumer.drain(timeout=0.01)
+
+        fake_channel.basic_client_nack.assert_called_once_with(delivery_tag=1, requeue=True)
+        consumer.close.assert_called_once_with()
+
+        await handler
+        fake_channel.basic_client_ack.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_shares_deadline(self, consumer, mocker: MockFixture):
+        clock = [100]
+        timeouts = []
+        release = asyncio.Event()
+
+        async def fake_wait_for(coro, timeout):
+            timeouts.append(timeout)
+            coro.close()
+            # basic_cancel takes 20 seconds, the in-flight message never finishes.
+            clock[0] += 20
+            raise asyncio.TimeoutError()
+
+        async def process_request(data):
+            await release.wait()
+
+        mocker.patch.object(asyncio.get_event_loop(), 'time', side_effect=lambda: clock[0])
+        mocker.patch('aioamqp_ext.base_consumer.asyncio.wait_for', fake_wait_for)
+        mocker.patch.object(consumer, 'process_request', process_request)
+        mocker.patch.object(consumer, 'deserialize_data', mocker.Mock())
+
+        handler = asyncio.ensure_future(consumer.on_message(CoroutineMock(), mocker.Mock(), mocker.Mock(), dict()))
+        await asyncio.sleep(0)
+        await consumer.drain(timeout=50)
+        release.set()
+        await handler
+
+        assert timeouts == [50, 30]
+
+    @pytest.mark.asyncio
+    async def test_ok_closes_streams(self, consumer):
+        fake_stream = CoroutineMock()
+        consumer._streams = {fake_stream}
+
+        await consumer.drain(timeout=1)
+
+        fake_stream.close.assert_called_once_with()
+        consumer.close.assert_called_once_with()
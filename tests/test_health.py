@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import aioamqp
+import pytest
+from aioamqp.channel import Channel
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.health import HealthMonitor
+
+
+@pytest.fixture
+def fake_amqp(mocker: MockFixture):
+    fake_channel = CoroutineMock(is_open=True)
+    fake_protocol = CoroutineMock(server_heartbeat=30)
+    fake_protocol.channel.return_value = fake_channel
+
+    return mocker.Mock(_protocol=fake_protocol, _transport=mocker.Mock(), is_connected=True, _in_flight={})
+
+
+class TestHealthMonitorProbe:
+    @pytest.mark.asyncio
+    async def test_ok(self, fake_amqp):
+        monitor = HealthMonitor(fake_amqp)
+
+        rtt = await monitor.probe()
+        await monitor.probe()
+
+        fake_amqp._protocol.channel.assert_called_once_with()
+        fake_channel = fake_amqp._protocol.channel.return_value
+        fake_channel.basic_qos.assert_called_with(prefetch_count=0, prefetch_size=0, connection_global=False)
+        assert fake_channel.basic_qos.call_count == 2
+
+        assert rtt >= 0
+        assert monitor.stats == {
+            'rtt': monitor.rtt,
+            'average_rtt': monitor.average_rtt,
+            'last_activity': monitor.last_activity,
+            'stalled': False,
+            'failures': 0,
+            'heartbeat': 30,
+        }
+
+    @pytest.mark.asyncio
+    async def test_ok_reopens_channel_on_new_connection(self, fake_amqp):
+        monitor = HealthMonitor(fake_amqp)
+        await monitor.probe()
+
+        new_protocol = CoroutineMock()
+        fake_amqp._protocol = new_protocol
+        await monitor.probe()
+
+        new_protocol.channel.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_error_timeout(self, fake_amqp):
+        async def hang(**kwargs):
+            await asyncio.sleep(1)
+
+        fake_amqp._protocol.channel.return_value.basic_qos.side_effect = hang
+        monitor = HealthMonitor(fake_amqp, timeout=0.01)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await monitor.probe()
+        monitor.stop()
+
+    @pytest.mark.asyncio
+    async def test_ok_waits_for_timed_out_round_trip(self, fake_amqp, mocker: MockFixture):
+        fake_amqp._protocol._loop = asyncio.get_event_loop()
+        fake_amqp._protocol._stream_writer = mocker.Mock()
+        channel = Channel(fake_amqp._protocol, 1)
+        fake_amqp._protocol.channel.return_value = channel
+        monitor = HealthMonitor(fake_amqp, timeout=0.001)
+
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await monitor.probe()
+
+        assert fake_amqp._protocol._stream_writer.write.call_count == 1
+        await channel.basic_qos_ok(mocker.Mock())
+
+        assert await monitor.probe() >= 0.003
+        # The next round trip is a new basic.qos, not a SynchronizationError.
+        with pytest.raises(asyncio.TimeoutError):
+            await monitor.probe()
+        assert fake_amqp._protocol._stream_writer.write.call_count == 2
+        monitor.stop()
+
+
+class TestHealthMonitorRun:
+    @pytest.mark.asyncio
+    async def test_ok_aborts_stalled_transport(self, fake_amqp):
+        fake_amqp._protocol.channel.side_effect = aioamqp.AmqpClosedConnection()
+        monitor = HealthMonitor(fake_amqp, interval=0.01, max_failures=2)
+
+        monitor.start()
+        await asyncio.sleep(0.005)
+        assert not monitor.stalled
+        assert monitor.failures == 1
+        fake_amqp._transport.abort.assert_not_called()
+
+        await asyncio.sleep(0.015)
+        monitor.stop()
+
+        assert monitor.stalled
+        assert monitor.failures == 2
+        fake_amqp._transport.abort.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_on_stall(self, fake_amqp):
+        fake_amqp._protocol.channel.side_effect = OSError()
+        fake_on_stall = CoroutineMock()
+        monitor = HealthMonitor(fake_amqp, interval=0.01, on_stall=fake_on_stall, max_failures=1)
+
+        monitor.start()
+        await asyncio.sleep(0.005)
+        monitor.stop()
+
+        fake_on_stall.assert_called_once_with(monitor)
+        fake_amqp._transport.abort.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_success_resets_failures(self, fake_amqp):
+        fake_channel = fake_amqp._protocol.channel.return_value
+        fake_channel.basic_qos.side_effect = [OSError(), None, OSError(), None]
+        monitor = HealthMonitor(fake_amqp, interval=0.001, max_failures=2)
+
+        monitor.start()
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+        assert monitor.failures == 2
+        assert not monitor.stalled
+        fake_amqp._transport.abort.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_ignores_timeout_with_delivery_in_flight(self, fake_amqp):
+        async def hang(**kwargs):
+            await asyncio.sleep(1)
+
+        fake_amqp._protocol.channel.return_value.basic_qos.side_effect = hang
+        fake_amqp._in_flight = {1: fake_amqp._protocol.channel.return_value}
+        monitor = HealthMonitor(fake_amqp, interval=0.001, timeout=0.001, max_failures=1)
+
+        monitor.start()
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+        assert monitor.failures == 0
+        assert not monitor.stalled
+        fake_amqp._transport.abort.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_long_delivery_with_real_channel(self, fake_amqp, mocker: MockFixture):
+        fake_amqp._protocol._loop = asyncio.get_event_loop()
+        fake_amqp._protocol._stream_writer = mocker.Mock()
+        channel = Channel(fake_amqp._protocol, 1)
+        fake_amqp._protocol.channel.return_value = channel
+        # qos-ok is not read while the delivery is being processed.
+        fake_amqp._in_flight = {1: channel}
+        monitor = HealthMonitor(fake_amqp, interval=0.001, timeout=0.001, max_failures=1)
+
+        monitor.start()
+        await asyncio.sleep(0.03)
+        monitor.stop()
+
+        assert monitor.failures == 0
+        assert not monitor.stalled
+        fake_amqp._transport.abort.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_skips_when_disconnected(self, fake_amqp):
+        fake_amqp.is_connected = False
+        monitor = HealthMonitor(fake_amqp, interval=0.01)
+
+        monitor.start()
+        await asyncio.sleep(0.005)
+        monitor.stop()
+
+        fake_amqp._protocol.channel.assert_not_called()
+        assert not monitor.stalled
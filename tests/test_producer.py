@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+
+import aioamqp
 import pytest
 from asynctest import CoroutineMock
 from pytest_mock import MockFixture
 
 from aioamqp_ext.base_producer import BaseProducer
+from aioamqp_ext.spool import DiskSpool
 
 
 @pytest.fixture
@@ -128,3 +132,219 @@ class TestBaseProducerPublishMessage:
             mandatory=fake_mandatory,
             immediate=fake_immediate,
         )
+
+
+class TestBaseProducerTemplate:
+    def test_ok_defaults(self, producer):
+        template = producer.template()
+
+        assert template.routing_key == producer._routing_key
+        assert template.properties == BaseProducer.DEFAULT_PROPERTIES
+        assert not template.mandatory
+        assert not template.immediate
+
+    def test_ok(self, producer, mocker: MockFixture):
+        fake_routing_key = mocker.Mock()
+        fake_properties = mocker.Mock()
+
+        template = producer.template(fake_routing_key, fake_properties, mandatory=True)
+
+        assert template.routing_key == fake_routing_key
+        assert template.properties == fake_properties
+        assert template.mandatory
+
+
+class TestBaseProducerSpool:
+    @staticmethod
+    @pytest.fixture
+    def spooled_producer(mocker: MockFixture):
+        BaseProducer.__bases__ = (CoroutineMock,)
+
+        producer = BaseProducer(spool=mocker.Mock(is_empty=True, replay=CoroutineMock()), spool_retry_interval=0)
+        mocker.patch.object(producer, '_init_connection', CoroutineMock())
+        mocker.patch.object(producer, 'serialize_data', mocker.Mock())
+        mocker.patch.object(producer, 'is_connected', True)
+
+        return producer
+
+    @pytest.mark.asyncio
+    async def test_ok_connected(self, spooled_producer):
+        await spooled_producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        spooled_producer._channel.basic_publish.assert_called_once_with(
+            payload=spooled_producer.serialize_data.return_value,
+            exchange_name=spooled_producer._exchange,
+            routing_key='foo.bar',
+            properties=BaseProducer.DEFAULT_PROPERTIES,
+            mandatory=False,
+            immediate=False,
+        )
+        spooled_producer._spool.append.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_spools_on_error(self, spooled_producer, mocker: MockFixture):
+        spooled_producer._channel.basic_publish.side_effect = aioamqp.AmqpClosedConnection()
+        mocked_schedule_replay = mocker.patch.object(spooled_producer, '_schedule_replay')
+
+        await spooled_producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        spooled_producer._spool.append.assert_called_once_with(
+            spooled_producer.serialize_data.return_value,
+            'foo.bar',
+            BaseProducer.DEFAULT_PROPERTIES
+        )
+        mocked_schedule_replay.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_spools_behind_spooled_messages(self, spooled_producer, mocker: MockFixture):
+        spooled_producer._spool.is_empty = False
+        mocked_schedule_replay = mocker.patch.object(spooled_producer, '_schedule_replay')
+
+        await spooled_producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        spooled_producer._channel.basic_publish.assert_not_called()
+        spooled_producer._spool.append.assert_called_once_with(
+            spooled_producer.serialize_data.return_value,
+            'foo.bar',
+            BaseProducer.DEFAULT_PROPERTIES
+        )
+        mocked_schedule_replay.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_replay_spool_retries(self, spooled_producer, mocker: MockFixture):
+        spool = spooled_producer._spool
+        spool.is_empty = False
+
+        async def replay(publish):
+            if spool.replay.call_count == 1:
+                raise OSError()
+            spool.is_empty = True
+
+        spool.replay.side_effect = replay
+
+        await spooled_producer.replay_spool()
+
+        assert spool.replay.call_count == 2
+        spool.replay.assert_called_with(spooled_producer._replay_message)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('payload, properties', [
+        (b'', None),
+        (b'foo', {'headers': {'ratio': 0.5}}),
+        (b'foo', {'unknown': 1}),
+    ])
+    async def test_error_spools_unpublishable(self, spooled_producer, mocker: MockFixture, payload, properties):
+        spooled_producer._spool.is_empty = False
+        spooled_producer.serialize_data.return_value = payload
+        mocked_schedule_replay = mocker.patch.object(spooled_producer, '_schedule_replay')
+
+        with pytest.raises(Exception):
+            await spooled_producer.publish_message(payload=payload, routing_key='foo.bar', properties=properties)
+
+        spooled_producer._spool.append.assert_not_called()
+        mocked_schedule_replay.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_replay_spool_skips_unpublishable(self, spooled_producer, mocker: MockFixture, tmpdir):
+        spool = spooled_producer._spool = DiskSpool(str(tmpdir))
+        spool.append(b'a', 'foo.bar')
+        # Spooled before publish_message checked messages.
+        spool.append(b'b', 'foo.bar', {'headers': {'ratio': 0.5}})
+        spool.append(b'c', 'foo.bar')
+        spool.append(b'd', 'foo.bar')
+        published = []
+
+        async def publish(payload, routing_key, properties):
+            published.append(payload)
+            if payload == b'c':
+                raise AssertionError('Payload cannot be empty')
+
+        mocker.patch.object(spooled_producer, '_publish', publish)
+
+        await spooled_producer.replay_spool()
+
+        assert published == [b'a', b'c', b'd']
+        assert spool.is_empty
+
+    @pytest.mark.asyncio
+    async def test_ok_replay_spool_serialized(self, spooled_producer):
+        spool = spooled_producer._spool
+        spool.is_empty = False
+
+        async def replay(publish):
+            await asyncio.sleep(0)
+            spool.is_empty = True
+
+        spool.replay.side_effect = replay
+
+        await asyncio.gather(spooled_producer.replay_spool(), spooled_producer.replay_spool())
+
+        spool.replay.assert_called_once_with(spooled_producer._replay_message)
+
+    @pytest.mark.asyncio
+    async def test_ok_init_connection_schedules_replay(self, spooled_producer, mocker: MockFixture):
+        spooled_producer._spool.is_empty = False
+        mocked_schedule_replay = mocker.patch.object(spooled_producer, '_schedule_replay')
+
+        # The fixture replaces _init_connection on the instance.
+        await BaseProducer._init_connection(spooled_producer)
+
+        mocked_schedule_replay.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_close(self, spooled_producer, mocker: MockFixture):
+        mocked_close = mocker.patch.object(CoroutineMock, 'close', CoroutineMock(), create=True)
+        replay_task = mocker.Mock()
+        spooled_producer._replay_task = replay_task
+
+        await spooled_producer.close()
+
+        replay_task.cancel.assert_called_once_with()
+        assert spooled_producer._replay_task is None
+        spooled_producer._spool.close.assert_called_once_with()
+        mocked_close.assert_called_once_with()
+
+
+class TestBaseProducerRateLimit:
+    @pytest.mark.asyncio
+    async def test_ok(self, mocker: MockFixture):
+        BaseProducer.__bases__ = (CoroutineMock,)
+
+        producer = BaseProducer(rate_limiter=CoroutineMock())
+        mocker.patch.object(producer, 'serialize_data', mocker.Mock())
+        mocker.patch.object(producer, 'is_connected', True)
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar', priority=10)
+
+        producer._rate_limiter.acquire.assert_called_once_with('foo.bar', 10)
+        producer._channel.basic_publish.assert_called_once_with(
+            payload=producer.serialize_data.return_value,
+            exchange_name=producer._exchange,
+            routing_key='foo.bar',
+            properties=BaseProducer.DEFAULT_PROPERTIES,
+            mandatory=False,
+            immediate=False,
+        )
+
+
+class TestBaseProducerTrace:
+    @pytest.mark.asyncio
+    async def test_ok(self, mocker: MockFixture):
+        BaseProducer.__bases__ = (CoroutineMock,)
+
+        producer = BaseProducer(trace=True)
+        mocker.patch.object(producer, 'serialize_data', mocker.Mock())
+        mocker.patch.object(producer, 'is_connected', True)
+        mocked_add_trace_headers = mocker.patch('aioamqp_ext.base_producer.add_trace_headers')
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        mocked_add_trace_headers.assert_called_once_with(BaseProducer.DEFAULT_PROPERTIES)
+        producer._channel.basic_publish.assert_called_once_with(
+            payload=producer.serialize_data.return_value,
+            exchange_name=producer._exchange,
+            routing_key='foo.bar',
+            properties=mocked_add_trace_headers.return_value,
+            mandatory=False,
+            immediate=False,
+        )
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import cProfile
+import logging
+import time
+
+import pytest
+from aioamqp.properties import Properties
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.profiling import (
+    add_trace_headers,
+    LatencyHistogram,
+    MessageProfiler,
+    PUBLISHED_AT_HEADER,
+    TRACE_ID_HEADER,
+)
+
+
+class TestAddTraceHeaders:
+    def test_ok(self, mocker: MockFixture):
+        mocker.patch('time.time', return_value=1500000000.25)
+        properties = {'delivery_mode': 2}
+
+        traced = add_trace_headers(properties)
+
+        assert properties == {'delivery_mode': 2}
+        assert traced['delivery_mode'] == 2
+        assert len(traced['headers'][TRACE_ID_HEADER]) == 32
+        assert traced['headers'][PUBLISHED_AT_HEADER] == '1500000000.25'
+
+    def test_ok_keeps_trace_id(self):
+        traced = add_trace_headers({'headers': {TRACE_ID_HEADER: 'foo', 'bar': 'baz'}})
+
+        assert traced['headers'][TRACE_ID_HEADER] == 'foo'
+        assert traced['headers']['bar'] == 'baz'
+
+
+class TestLatencyHistogram:
+    def test_ok(self):
+        histogram = LatencyHistogram(buckets=(0.1, 1, float('inf')))
+
+        for value in (0.05, 0.05, 0.5, 3):
+            histogram.record(value)
+
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.average == pytest.approx(0.9)
+        assert histogram.max == 3
+        assert histogram.percentile(50) == 0.1
+        assert histogram.percentile(75) == 1
+        assert histogram.percentile(100) == 3
+
+    def test_ok_empty(self):
+        assert LatencyHistogram().percentile(99) == 0
+
+
+class TestMessageProfiler:
+    @staticmethod
+    def make_envelope(mocker: MockFixture):
+        return mocker.Mock(routing_key='foo.bar')
+
+    @pytest.mark.asyncio
+    async def test_ok_latency(self, mocker: MockFixture):
+        profiler = MessageProfiler()
+        fake_handler = CoroutineMock()
+
+        await profiler.run(fake_handler, 'data', b'body', self.make_envelope(mocker), Properties())
+
+        fake_handler.assert_called_once_with('data')
+        assert profiler.latencies['foo.bar'].count == 1
+        assert profiler.queue_delays == {}
+        assert profiler.profile_stats is None
+
+    @pytest.mark.asyncio
+    async def test_ok_queue_delay(self, mocker: MockFixture):
+        profiler = MessageProfiler()
+        properties = Properties(headers={PUBLISHED_AT_HEADER: repr(time.time() - 2)})
+
+        await profiler.run(CoroutineMock(), 'data', b'body', self.make_envelope(mocker), properties)
+
+        assert profiler.queue_delays['foo.bar'].max >= 2
+
+    @pytest.mark.asyncio
+    async def test_ok_slow_message(self, mocker: MockFixture, caplog):
+        profiler = MessageProfiler(slow_threshold=0)
+        properties = Properties(delivery_mode=2, headers={TRACE_ID_HEADER: 'trace'})
+
+        with caplog.at_level(logging.WARNING):
+            await profiler.run(CoroutineMock(), 'data', b'body', self.make_envelope(mocker), properties)
+
+        assert 'routing_key=foo.bar size=4 trace_id=trace' in caplog.text
+        assert "'delivery_mode': 2" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_ok_sampled(self, mocker: MockFixture, tmpdir):
+        profiler = MessageProfiler(sample_rate=1)
+
+        async def handler(data):
+            await asyncio.sleep(0)
+            sum(range(100))
+
+        for _ in range(2):
+            await profiler.run(handler, 'data', b'body', self.make_envelope(mocker), Properties())
+
+        assert profiler.profile_stats.total_calls > 0
+        stats_file = tmpdir.join('consumer.prof')
+        profiler.dump_stats(str(stats_file))
+        assert stats_file.size() > 0
+
+    @pytest.mark.asyncio
+    async def test_ok_samples_one_message_at_a_time(self, mocker: MockFixture):
+        fake_factory = mocker.Mock(side_effect=cProfile.Profile)
+        profiler = MessageProfiler(sample_rate=1, profiler_factory=fake_factory)
+        release = asyncio.Event()
+
+        async def handler(data):
+            await release.wait()
+
+        first = asyncio.ensure_future(profiler.run(handler, 'data', b'body', self.make_envelope(mocker), Properties()))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(profiler.run(handler, 'data', b'body', self.make_envelope(mocker), Properties()))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, second)
+
+        fake_factory.assert_called_once_with()
+        assert profiler.latencies['foo.bar'].count == 2
+        assert not MessageProfiler._sampling
+
+    @pytest.mark.asyncio
+    async def test_ok_enable_failed(self, mocker: MockFixture):
+        fake_profiler = mocker.Mock()
+        fake_profiler.enable.side_effect = ValueError('Another profiling tool is already active')
+        profiler = MessageProfiler(sample_rate=1, profiler_factory=mocker.Mock(return_value=fake_profiler))
+        fake_handler = CoroutineMock()
+
+        await profiler.run(fake_handler, 'data', b'body', self.make_envelope(mocker), Properties())
+
+        fake_handler.assert_called_once_with('data')
+        fake_profiler.disable.assert_not_called()
+        assert profiler.profile_stats is None
+        assert not MessageProfiler._sampling
+
+    @pytest.mark.asyncio
+    async def test_ok_handler_error(self, mocker: MockFixture):
+        profiler = MessageProfiler()
+
+        with pytest.raises(ValueError):
+            await profiler.run(CoroutineMock(side_effect=ValueError()), 'data', b'body',
+                               self.make_envelope(mocker), Properties())
+
+        assert profiler.latencies['foo.bar'].count == 1
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from aioamqp.channel import Channel
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.publish_template import PublishTemplate
+
+
+@pytest.fixture
+def fake_channel(mocker: MockFixture):
+    fake_protocol = CoroutineMock(_loop=asyncio.get_event_loop(), server_frame_max=None)
+    fake_protocol._stream_writer = mocker.Mock()
+    channel = Channel(fake_protocol, 3)
+
+    return channel
+
+
+@pytest.fixture
+def fake_producer(mocker: MockFixture, fake_channel):
+    producer = mocker.Mock(_exchange='my_exchange', _channel=fake_channel, _spool=None, _trace=False,
+                           _rate_limiter=None, is_connected=True)
+    producer.serialize_data.side_effect = lambda data: data
+    producer._init_connection = CoroutineMock()
+
+    return producer
+
+
+def written_bytes(channel):
+    return b''.join(call[0][0] for call in channel.protocol._stream_writer.write.call_args_list)
+
+
+class TestPublishTemplate:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('properties', [
+        None,
+        dict(delivery_mode=2),
+        dict(content_type='application/json', headers={'foo': 'bar'}, delivery_mode=2),
+    ])
+    async def test_ok_same_frames_as_basic_publish(self, fake_producer, fake_channel, properties):
+        template = PublishTemplate(fake_producer, 'foo.bar', properties, mandatory=True)
+
+        await fake_channel.basic_publish(
+            payload=b'payload',
+            exchange_name='my_exchange',
+            routing_key='foo.bar',
+            properties=properties,
+            mandatory=True,
+        )
+        expected = written_bytes(fake_channel)
+        fake_channel.protocol._stream_writer.reset_mock()
+
+        await template.publish(b'payload')
+        await template.publish(b'payload')
+
+        assert written_bytes(fake_channel) == expected * 2
+        fake_channel.protocol._drain.assert_called_with()
+
+    def test_ok_split_body(self, fake_producer, fake_channel):
+        fake_channel.protocol.server_frame_max = 18
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+
+        message = template.encode_message(fake_channel, b'0123456789abcdefghij')
+
+        assert message.endswith(
+            b'\x03\x00\x03\x00\x00\x00\x0a0123456789\xce'
+            b'\x03\x00\x03\x00\x00\x00\x0aabcdefghij\xce'
+        )
+
+    @pytest.mark.asyncio
+    async def test_ok_reencode_on_new_channel(self, fake_producer, fake_channel):
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+        await template.publish(b'payload')
+
+        new_channel = Channel(fake_channel.protocol, 5)
+        fake_producer._channel = new_channel
+        message = template.encode_message(new_channel, b'payload')
+
+        assert message.startswith(b'\x01\x00\x05')
+
+    @pytest.mark.asyncio
+    async def test_ok_is_not_connected(self, fake_producer):
+        fake_producer.is_connected = False
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+
+        await template.publish(b'payload')
+
+        fake_producer._init_connection.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_with_spool(self, fake_producer, mocker: MockFixture):
+        fake_producer._spool = mocker.Mock()
+        fake_producer.publish_message = CoroutineMock()
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+
+        await template.publish(b'payload')
+
+        fake_producer.publish_message.assert_called_once_with(b'payload', 'foo.bar', None, False, False, 0)
+        fake_producer._init_connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_with_rate_limiter(self, fake_producer, fake_channel):
+        fake_producer._rate_limiter = CoroutineMock()
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+
+        await template.publish(b'payload', priority=10)
+
+        fake_producer._rate_limiter.acquire.assert_called_once_with('foo.bar', 10)
+        fake_channel.protocol._stream_writer.write.assert_called_once_with(
+            template.encode_message(fake_channel, b'payload')
+        )
+
+    @pytest.mark.asyncio
+    async def test_error_empty_payload(self, fake_producer):
+        template = PublishTemplate(fake_producer, 'foo.bar', None)
+
+        with pytest.raises(ValueError):
+            await template.publish(b'')
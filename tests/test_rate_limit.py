@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from aioamqp_ext.rate_limit import KEY_BUCKET_SWEEP_INTERVAL, RateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    def test_ok(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        assert bucket.wait_time(0) == 0
+        bucket.take(0)
+        bucket.take(0)
+        assert bucket.wait_time(0) == pytest.approx(0.1)
+        assert bucket.wait_time(0.05) == pytest.approx(0.05)
+        assert bucket.wait_time(1) == 0
+
+    def test_ok_capacity_is_capped(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        bucket.wait_time(0)
+        bucket.take(100)
+        bucket.take(100)
+
+        assert bucket.wait_time(100) > 0
+
+    def test_ok_is_full(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        assert bucket.is_full(0)
+        bucket.take(0)
+        assert not bucket.is_full(0.05)
+        assert bucket.is_full(0.1)
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_ok_unlimited(self):
+        limiter = RateLimiter()
+
+        for _ in range(100):
+            assert await limiter.acquire('foo') == 0
+
+        assert limiter.stats[0].count == 100
+        assert limiter.stats[0].max_delay == 0
+
+    @pytest.mark.asyncio
+    async def test_ok_global_rate(self):
+        limiter = RateLimiter(rate=100, capacity=1)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+
+        await asyncio.gather(*(limiter.acquire('foo') for _ in range(5)))
+
+        assert loop.time() - start >= 0.035
+        assert limiter.stats[0].count == 5
+        assert limiter.stats[0].max_delay > 0
+        assert limiter.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_ok_key_rate_does_not_block_other_keys(self):
+        limiter = RateLimiter(key_rates={'slow': 1})
+        await limiter.acquire('slow')
+
+        slow = asyncio.ensure_future(limiter.acquire('slow'))
+        await asyncio.sleep(0)
+
+        assert await asyncio.wait_for(limiter.acquire('fast'), 0.5) < 0.5
+        assert not slow.done()
+        slow.cancel()
+
+    @pytest.mark.asyncio
+    async def test_ok_priority(self):
+        limiter = RateLimiter(rate=50, capacity=1)
+        await limiter.acquire()
+        order = []
+
+        async def publish(name, priority):
+            await limiter.acquire('foo', priority)
+            order.append(name)
+
+        low = [asyncio.ensure_future(publish('low{}'.format(index), 0)) for index in range(2)]
+        await asyncio.sleep(0)
+        high = asyncio.ensure_future(publish('high', 10))
+        await asyncio.gather(high, *low)
+
+        assert order == ['high', 'low0', 'low1']
+        assert set(limiter.stats) == {0, 10}
+
+    @pytest.mark.asyncio
+    async def test_ok_cancelled_waiter(self):
+        limiter = RateLimiter(rate=50, capacity=1)
+        await limiter.acquire()
+
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        await asyncio.wait_for(limiter.acquire(), 0.5)
+        assert limiter.queued == 0
+
+    def test_ok_evicts_idle_key_buckets(self):
+        limiter = RateLimiter(key_rate=10, key_rates={'slow': 1})
+        for index in range(100):
+            limiter._try_take('key.{}'.format(index), 0)
+        limiter._try_take('slow', 0)
+
+        limiter._try_take('busy', KEY_BUCKET_SWEEP_INTERVAL - 0.01)
+        limiter._try_take('fresh', KEY_BUCKET_SWEEP_INTERVAL)
+
+        assert set(limiter._key_buckets) == {'slow', 'busy', 'fresh'}
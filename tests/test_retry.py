@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from aioamqp.properties import Properties
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.retry import RetryPolicy
+
+
+class TestRetryPolicyInit:
+    def test_ok_default_delays(self):
+        assert RetryPolicy().delays == [1, 4, 16, 64, 256]
+
+    def test_ok_backoff(self):
+        assert RetryPolicy(initial_delay=0.5, multiplier=2, max_attempts=3).delays == [0.5, 1, 2]
+
+    def test_ok_delays(self):
+        assert RetryPolicy(delays=(10, 60)).delays == [10, 60]
+
+
+class TestRetryPolicyDeclare:
+    @pytest.mark.asyncio
+    async def test_ok(self):
+        fake_channel = CoroutineMock()
+
+        await RetryPolicy(delays=[1, 0.5, 1]).declare(fake_channel, 'foo')
+
+        assert fake_channel.queue_declare.call_args_list == [
+            ((), dict(
+                queue_name='foo.retry.500',
+                durable=True,
+                arguments={'x-message-ttl': 500, 'x-dead-letter-exchange': '', 'x-dead-letter-routing-key': 'foo'}
+            )),
+            ((), dict(
+                queue_name='foo.retry.1000',
+                durable=True,
+                arguments={'x-message-ttl': 1000, 'x-dead-letter-exchange': '', 'x-dead-letter-routing-key': 'foo'}
+            )),
+            ((), dict(queue_name='foo.dead', durable=True)),
+        ]
+
+
+class TestRetryPolicyRepublish:
+    @staticmethod
+    @pytest.fixture
+    def policy():
+        return RetryPolicy(delays=[1, 10])
+
+    @pytest.mark.asyncio
+    async def test_ok_first_attempt(self, policy: RetryPolicy):
+        fake_channel = CoroutineMock()
+        properties = Properties(content_type='application/json', delivery_mode=2)
+
+        await policy.republish(fake_channel, 'foo', b'body', properties)
+
+        fake_channel.basic_publish.assert_called_once_with(
+            payload=b'body',
+            exchange_name='',
+            routing_key='foo.retry.1000',
+            properties={
+                'content_type': 'application/json',
+                'delivery_mode': 2,
+                'headers': {'x-retry-attempt': 1},
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_ok_next_attempt(self, policy: RetryPolicy):
+        fake_channel = CoroutineMock()
+        properties = Properties(headers={'x-retry-attempt': 1, 'x-death': [], 'foo': 'bar'})
+
+        await policy.republish(fake_channel, 'foo', b'body', properties)
+
+        fake_channel.basic_publish.assert_called_once_with(
+            payload=b'body',
+            exchange_name='',
+            routing_key='foo.retry.10000',
+            properties={'headers': {'x-retry-attempt': 2, 'foo': 'bar'}},
+        )
+
+    @pytest.mark.asyncio
+    async def test_ok_dead_letter(self, policy: RetryPolicy, mocker: MockFixture):
+        fake_channel = CoroutineMock()
+        properties = Properties(headers={'x-retry-attempt': 2})
+
+        await policy.republish(fake_channel, 'foo', b'body', properties)
+
+        fake_channel.basic_publish.assert_called_once_with(
+            payload=b'body',
+            exchange_name='',
+            routing_key='foo.dead',
+            properties={'headers': {'x-retry-attempt': 3}},
+        )
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext import runner
+from aioamqp_ext.base_consumer import BaseConsumer
+from aioamqp_ext.runner import ConsumerRunner, import_consumer, load_config, parse_args, run_worker
+
+
+class TestImportConsumer:
+    @pytest.mark.parametrize('path', [
+        'aioamqp_ext.base_consumer:BaseConsumer',
+        'aioamqp_ext.base_consumer.BaseConsumer',
+    ])
+    def test_ok(self, path):
+        assert import_consumer(path) is BaseConsumer
+
+    @pytest.mark.parametrize('path', [
+        'BaseConsumer',
+        'aioamqp_ext.base_consumer:Unknown',
+    ])
+    def test_error(self, path):
+        with pytest.raises(ImportError):
+            import_consumer(path)
+
+
+class TestLoadConfig:
+    def test_ok(self, tmpdir):
+        config_file = tmpdir.join('consumer.json')
+        config_file.write(json.dumps({'queue': 'foo'}))
+
+        assert load_config(str(config_file)) == {'queue': 'foo'}
+
+    def test_ok_wo_path(self):
+        assert load_config(None) == {}
+
+
+class TestParseArgs:
+    def test_ok(self):
+        args = parse_args(['foo:Bar', '--workers', '3', '--drain-timeout', '5', '--uvloop'])
+
+        assert args.consumer == 'foo:Bar'
+        assert args.config is None
+        assert args.workers == 3
+        assert args.drain_timeout == 5
+        assert args.uvloop
+
+
+class TestRunWorker:
+    @staticmethod
+    @pytest.fixture
+    def consumer_class(mocker: MockFixture):
+        consumer_class = mocker.Mock()
+        consumer = consumer_class.return_value
+        consumer.consume = CoroutineMock()
+        consumer.wait_closed = CoroutineMock(side_effect=lambda: asyncio.sleep(10))
+        consumer.drain = CoroutineMock()
+        return consumer_class
+
+    def test_ok_drains_on_sigterm(self, consumer_class, mocker: MockFixture):
+        mocked_signal = mocker.spy(signal, 'signal')
+        consumer = consumer_class.return_value
+        consumer.consume.side_effect = lambda: os.kill(os.getpid(), signal.SIGTERM)
+
+        run_worker(consumer_class, {'queue': 'foo'}, drain_timeout=3)
+
+        mocked_signal.assert_any_call(signal.SIGINT, signal.SIG_DFL)
+        mocked_signal.assert_any_call(signal.SIGTERM, signal.SIG_DFL)
+        assert consumer_class.call_args[1]['queue'] == 'foo'
+        consumer.drain.assert_called_once_with(timeout=3)
+
+    def test_error_connection_lost(self, consumer_class):
+        consumer = consumer_class.return_value
+        consumer.wait_closed.side_effect = None
+
+        with pytest.raises(SystemExit) as exc_info:
+            run_worker(consumer_class, {}, drain_timeout=3)
+
+        assert exc_info.value.code == 1
+        consumer.drain.assert_not_called()
+
+
+class TestConsumerRunner:
+    @staticmethod
+    @pytest.fixture
+    def consumer_runner(mocker: MockFixture):
+        mocker.patch('multiprocessing.Process')
+        mocker.patch('time.monotonic', return_value=100)
+
+        return ConsumerRunner(BaseConsumer, config={'queue': 'foo'}, workers=2, drain_timeout=5, restart_delay=1)
+
+    def test_ok_supervise_spawns_workers(self, consumer_runner):
+        consumer_runner.supervise()
+
+        assert runner.multiprocessing.Process.call_count == 2
+        runner.multiprocessing.Process.assert_called_with(
+            target=runner.run_worker,
+            args=(BaseConsumer, {'queue': 'foo'}, 5, False),
+            name='BaseConsumer-1',
+        )
+
+    def test_ok_supervise_restarts_crashed_worker(self, consumer_runner, mocker: MockFixture):
+        alive = mocker.Mock(is_alive=mocker.Mock(return_value=True))
+        crashed = mocker.Mock(is_alive=mocker.Mock(return_value=False), exitcode=1)
+        consumer_runner._processes = [alive, crashed]
+        consumer_runner._started_at = [0, 0]
+
+        consumer_runner.supervise()
+
+        runner.multiprocessing.Process.assert_called_once_with(
+            target=runner.run_worker,
+            args=(BaseConsumer, {'queue': 'foo'}, 5, False),
+            name='BaseConsumer-1',
+        )
+        assert consumer_runner._processes == [alive, runner.multiprocessing.Process.return_value]
+
+    def test_ok_supervise_delays_restart(self, consumer_runner, mocker: MockFixture):
+        crashed = mocker.Mock(is_alive=mocker.Mock(return_value=False), exitcode=1)
+        consumer_runner._processes = [crashed, crashed]
+        consumer_runner._started_at = [99.5, 99.5]
+
+        consumer_runner.supervise()
+
+        runner.multiprocessing.Process.assert_not_called()
+
+    def test_ok_stop(self, consumer_runner, mocker: MockFixture):
+        mocked_kill = mocker.patch('os.kill')
+        alive = mocker.Mock(pid=1, is_alive=mocker.Mock(return_value=True))
+        dead = mocker.Mock(pid=2, is_alive=mocker.Mock(return_value=False))
+        consumer_runner._processes = [alive, dead]
+
+        consumer_runner.stop()
+
+        assert consumer_runner._stopping
+        mocked_kill.assert_called_once_with(1, signal.SIGTERM)
+
+    def test_ok_join_kills_stuck_worker(self, consumer_runner, mocker: MockFixture):
+        mocked_kill = mocker.patch('os.kill')
+        stuck = mocker.Mock(pid=1, is_alive=mocker.Mock(return_value=True))
+        consumer_runner._processes = [stuck, None]
+
+        consumer_runner.join()
+
+        stuck.join.assert_called_with()
+        mocked_kill.assert_called_once_with(1, signal.SIGKILL)
+
+    def test_ok_run(self, consumer_runner, mocker: MockFixture):
+        mocked_signal = mocker.patch('signal.signal')
+        mocker.patch('time.sleep')
+        mocked_join = mocker.patch.object(consumer_runner, 'join')
+        mocked_supervise = mocker.patch.object(consumer_runner, 'supervise', side_effect=consumer_runner.stop)
+
+        consumer_runner.run()
+
+        mocked_signal.assert_any_call(signal.SIGINT, consumer_runner.stop)
+        mocked_signal.assert_any_call(signal.SIGTERM, consumer_runner.stop)
+        mocked_supervise.assert_called_once_with()
+        mocked_join.assert_called_once_with()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import aioamqp
+import pytest
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.rate_limit import RateLimiter
+from aioamqp_ext.sharded_producer import (
+    CONSISTENT_HASH,
+    ROUND_ROBIN,
+    ShardedProducer,
+    ShardsUnavailableException,
+)
+
+
+def fake_producer_class(url, **kwargs):
+    return CoroutineMock(url=url, kwargs=kwargs)
+
+
+def make_producer(routing=CONSISTENT_HASH, **kwargs):
+    return ShardedProducer(
+        urls=['amqp://first/', 'amqp://second/'],
+        connections_per_url=2,
+        routing=routing,
+        producer_class=fake_producer_class,
+        **kwargs
+    )
+
+
+def published_shards(producer):
+    return [shard for shard in producer.shards if shard.publish_message.called]
+
+
+class TestShardedProducerInit:
+    def test_ok(self):
+        producer = make_producer(exchange='foo')
+
+        assert [shard.url for shard in producer.shards] == [
+            'amqp://first/', 'amqp://first/', 'amqp://second/', 'amqp://second/'
+        ]
+        assert all(shard.kwargs == {'exchange': 'foo'} for shard in producer.shards)
+
+    def test_ok_single_url(self):
+        producer = ShardedProducer(urls='amqp://first/', producer_class=fake_producer_class)
+
+        assert [shard.url for shard in producer.shards] == ['amqp://first/']
+
+    def test_error_unknown_routing(self):
+        with pytest.raises(LookupError):
+            make_producer(routing='unknown')
+
+    def test_error_shared_spool(self, mocker: MockFixture):
+        with pytest.raises(ValueError):
+            make_producer(spool=mocker.Mock())
+
+
+class TestShardedProducerPublishMessage:
+    @pytest.mark.asyncio
+    async def test_ok_consistent_hash_is_sticky(self):
+        producer = make_producer()
+
+        for _ in range(10):
+            await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        shards = published_shards(producer)
+        assert len(shards) == 1
+        assert shards[0].publish_message.call_count == 10
+        shards[0].publish_message.assert_called_with(
+            payload='foo',
+            routing_key='foo.bar',
+            properties=None,
+            mandatory=False,
+            immediate=False,
+            priority=0,
+        )
+
+    @pytest.mark.asyncio
+    async def test_ok_forwards_priority(self):
+        producer = make_producer()
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar', priority=10)
+
+        shard, = published_shards(producer)
+        assert shard.publish_message.call_args[1]['priority'] == 10
+
+    @pytest.mark.asyncio
+    async def test_ok_consistent_hash_spreads_keys(self):
+        producer = make_producer()
+
+        for index in range(100):
+            await producer.publish_message(payload='foo', routing_key='key.{}'.format(index))
+
+        assert len(published_shards(producer)) == 4
+
+    @pytest.mark.asyncio
+    async def test_ok_round_robin(self):
+        producer = make_producer(routing=ROUND_ROBIN)
+
+        for _ in range(8):
+            await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        assert [shard.publish_message.call_count for shard in producer.shards] == [2, 2, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_ok_failover(self, mocker: MockFixture):
+        producer = make_producer()
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+        primary, = published_shards(producer)
+        primary.publish_message.side_effect = aioamqp.AmqpClosedConnection()
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        fallback, = [shard for shard in published_shards(producer) if shard is not primary]
+        assert fallback.publish_message.call_count == 2
+        assert primary.publish_message.call_count == 2
+        assert primary not in producer.healthy_shards
+
+    @pytest.mark.asyncio
+    async def test_ok_rate_limiter(self):
+        rate_limiter = CoroutineMock()
+        producer = make_producer(rate_limiter=rate_limiter)
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar', priority=10)
+
+        rate_limiter.acquire.assert_called_once_with('foo.bar', 10)
+        assert all('rate_limiter' not in shard.kwargs for shard in producer.shards)
+
+    @pytest.mark.asyncio
+    async def test_ok_rate_limit_is_not_a_timeout(self):
+        producer = make_producer(rate_limiter=RateLimiter(rate=100, capacity=1), publish_timeout=0.02)
+
+        await asyncio.gather(*(producer.publish_message(payload='foo', routing_key='foo.bar') for _ in range(5)))
+
+        assert len(producer.healthy_shards) == 4
+
+    @pytest.mark.asyncio
+    async def test_ok_failover_on_timeout(self):
+        producer = make_producer(publish_timeout=0.01)
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+        primary, = published_shards(producer)
+        primary.publish_message.side_effect = lambda **kwargs: asyncio.sleep(1)
+
+        await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        fallback, = [shard for shard in published_shards(producer) if shard is not primary]
+        assert fallback.publish_message.call_count == 1
+        assert primary not in producer.healthy_shards
+
+    @pytest.mark.asyncio
+    async def test_error_all_shards_failed(self):
+        producer = make_producer()
+        for shard in producer.shards:
+            shard.publish_message.side_effect = OSError()
+
+        with pytest.raises(ShardsUnavailableException):
+            await producer.publish_message(payload='foo', routing_key='foo.bar')
+
+        assert producer.healthy_shards == []
+
+
+class TestShardedProducerClose:
+    @pytest.mark.asyncio
+    async def test_ok(self):
+        producer = make_producer()
+
+        await producer.close()
+
+        for shard in producer.shards:
+            shard.close.assert_called_once_with()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+from asynctest import CoroutineMock
+
+from aioamqp_ext.spool import DiskSpool, SpoolFullException
+
+
+@pytest.fixture
+def spool_dir(tmpdir):
+    return str(tmpdir.join('spool'))
+
+
+def segment_files(path):
+    return sorted(name for name in os.listdir(path) if name.endswith('.spool'))
+
+
+class TestDiskSpoolAppend:
+    def test_ok(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+        assert spool.is_empty
+
+        spool.append('foo', 'foo.bar', {'delivery_mode': 2})
+
+        assert not spool.is_empty
+        assert spool.size > 0
+        assert segment_files(spool_dir) == ['00000000000000000001.spool']
+
+    def test_ok_rotates_segments(self, spool_dir):
+        spool = DiskSpool(spool_dir, segment_size=1)
+
+        for _ in range(3):
+            spool.append(b'foo', 'foo.bar')
+
+        assert len(segment_files(spool_dir)) == 3
+
+    def test_error_full(self, spool_dir):
+        spool = DiskSpool(spool_dir, max_bytes=200)
+        spool.append(b'x' * 100, 'foo.bar')
+
+        with pytest.raises(SpoolFullException):
+            spool.append(b'x' * 100, 'foo.bar')
+
+    def test_error_unsupported_property(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+
+        with pytest.raises(TypeError):
+            spool.append(b'foo', 'foo.bar', {'headers': {'foo': object()}})
+
+        assert spool.size == 0
+
+
+class TestDiskSpoolReplay:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('use_mmap', [False, True])
+    async def test_ok_in_order(self, spool_dir, use_mmap):
+        spool = DiskSpool(spool_dir, segment_size=64, use_mmap=use_mmap)
+        for index in range(10):
+            spool.append('message {}'.format(index), 'key.{}'.format(index), {'delivery_mode': 2})
+        fake_publish = CoroutineMock()
+
+        await spool.replay(fake_publish)
+
+        assert [call[0] for call in fake_publish.call_args_list] == [
+            ('message {}'.format(index).encode(), 'key.{}'.format(index), {'delivery_mode': 2})
+            for index in range(10)
+        ]
+        assert spool.is_empty
+        assert segment_files(spool_dir) == []
+
+    @pytest.mark.asyncio
+    async def test_ok_bytes_header(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+        properties = {'headers': {'foo': b'\x00bar', 'baz': 'qux'}}
+        spool.append(b'foo', 'foo.bar', properties)
+        fake_publish = CoroutineMock()
+
+        await spool.replay(fake_publish)
+
+        fake_publish.assert_called_once_with(b'foo', 'foo.bar', properties)
+
+    @pytest.mark.asyncio
+    async def test_ok_survives_restart(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+        spool.append(b'foo', 'foo.bar')
+        spool.close()
+
+        restarted = DiskSpool(spool_dir)
+        fake_publish = CoroutineMock()
+        await restarted.replay(fake_publish)
+
+        fake_publish.assert_called_once_with(b'foo', 'foo.bar', None)
+
+    @pytest.mark.asyncio
+    async def test_ok_skips_torn_record(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+        spool.append(b'foo', 'foo.bar')
+        spool.append(b'bar', 'foo.bar')
+        spool.close()
+
+        path = os.path.join(spool_dir, segment_files(spool_dir)[0])
+        with open(path, 'r+b') as segment:
+            segment.truncate(os.path.getsize(path) - 1)
+
+        fake_publish = CoroutineMock()
+        await DiskSpool(spool_dir).replay(fake_publish)
+
+        fake_publish.assert_called_once_with(b'foo', 'foo.bar', None)
+
+    @pytest.mark.asyncio
+    async def test_ok_resumes_after_failure(self, spool_dir):
+        spool = DiskSpool(spool_dir)
+        for payload in (b'1', b'2', b'3'):
+            spool.append(payload, 'foo.bar')
+        fake_publish = CoroutineMock(side_effect=[None, OSError(), None, None, None])
+
+        with pytest.raises(OSError):
+            await spool.replay(fake_publish)
+        assert not spool.is_empty
+
+        spool.append(b'4', 'foo.bar')
+        await spool.replay(fake_publish)
+
+        assert [call[0][0] for call in fake_publish.call_args_list] == [b'1', b'2', b'2', b'3', b'4']
+        assert spool.is_empty
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from asynctest import CoroutineMock
+from pytest_mock import MockFixture
+
+from aioamqp_ext.stream import Message, MessageStream
+
+
+@pytest.fixture
+def fake_consumer(mocker: MockFixture):
+    consumer = mocker.Mock(is_connected=True, _channel=CoroutineMock(last_consumer_tag='fake_tag'))
+    consumer._init_connection = CoroutineMock()
+    consumer.deserialize_data.side_effect = lambda body: body.decode()
+
+    return consumer
+
+
+@pytest.fixture
+def stream(fake_consumer):
+    return MessageStream(fake_consumer, 'my_queue', 2)
+
+
+def make_envelope(mocker: MockFixture, delivery_tag):
+    return mocker.Mock(delivery_tag=delivery_tag, routing_key='foo.bar')
+
+
+class TestMessage:
+    @pytest.mark.asyncio
+    async def test_ok_ack(self, mocker: MockFixture):
+        fake_channel = CoroutineMock()
+        message = Message(fake_channel, b'body', make_envelope(mocker, 1), None, 'body')
+
+        await message.ack()
+        await message.ack()
+        await message.nack()
+
+        assert message.settled
+        assert message.routing_key == 'foo.bar'
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=1)
+        fake_channel.basic_client_nack.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ok_nack(self, mocker: MockFixture):
+        fake_channel = CoroutineMock()
+        message = Message(fake_channel, b'body', make_envelope(mocker, 1), None, 'body')
+
+        await message.nack(requeue=False)
+        await message.ack()
+
+        fake_channel.basic_client_nack.assert_called_once_with(delivery_tag=1, requeue=False)
+        fake_channel.basic_client_ack.assert_not_called()
+
+
+class TestMessageStream:
+    @pytest.mark.asyncio
+    async def test_ok_start(self, stream: MessageStream, fake_consumer):
+        await stream.start()
+
+        fake_consumer._init_connection.assert_not_called()
+        fake_consumer._channel.basic_consume.assert_called_once_with(stream.on_message, queue_name='my_queue')
+
+    @pytest.mark.asyncio
+    async def test_ok_start_is_not_connected(self, stream: MessageStream, fake_consumer):
+        fake_consumer.is_connected = False
+
+        await stream.start()
+
+        fake_consumer._init_connection.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok_iterate(self, stream: MessageStream, mocker: MockFixture):
+        await stream.start()
+
+        fake_channel = CoroutineMock()
+        await stream.on_message(fake_channel, b'first', make_envelope(mocker, 1), None)
+        await stream.on_message(fake_channel, b'second', make_envelope(mocker, 2), None)
+
+        received = []
+        async for message in stream:
+            received.append(message.data)
+            await message.ack()
+            if len(received) == 2:
+                await stream.close()
+
+        assert received == ['first', 'second']
+        assert fake_channel.basic_client_ack.call_count == 2
+        stream._consumer._channel.basic_cancel.assert_called_once_with('fake_tag')
+
+    @pytest.mark.asyncio
+    async def test_ok_bounded_buffer(self, stream: MessageStream, mocker: MockFixture):
+        await stream.start()
+
+        fake_channel = CoroutineMock()
+        await stream.on_message(fake_channel, b'1', make_envelope(mocker, 1), None)
+        await stream.on_message(fake_channel, b'2', make_envelope(mocker, 2), None)
+
+        blocked = asyncio.ensure_future(stream.on_message(fake_channel, b'3', make_envelope(mocker, 3), None))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        await stream.__anext__()
+        await asyncio.sleep(0)
+        assert blocked.done()
+
+    @pytest.mark.asyncio
+    async def test_ok_close_wakes_reader(self, stream: MessageStream):
+        await stream.start()
+
+        reader = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        await stream.close()
+
+        with pytest.raises(StopAsyncIteration):
+            await reader
+
+    @pytest.mark.asyncio
+    async def test_ok_deserialize_error(self, stream: MessageStream, fake_consumer, mocker: MockFixture):
+        await stream.start()
+
+        fake_consumer.deserialize_data.side_effect = ValueError()
+        fake_channel = CoroutineMock()
+
+        await stream.on_message(fake_channel, b'body', make_envelope(mocker, 1), None)
+
+        fake_channel.basic_client_ack.assert_called_once_with(delivery_tag=1)
+        assert stream._buffer.empty()
+
+    @pytest.mark.asyncio
+    async def test_ok_pipe(self, stream: MessageStream, mocker: MockFixture):
+        await stream.start()
+
+        async def upper(messages):
+            async for message in messages:
+                yield message.data.upper()
+
+        async def exclaim(items):
+            async for item in items:
+                yield item + '!'
+
+        await stream.on_message(CoroutineMock(), b'foo', make_envelope(mocker, 1), None)
+
+        assert await stream.pipe(upper, exclaim).__anext__() == 'FOO!'
+
+    @pytest.mark.asyncio
+    async def test_ok_close_requeues_buffered(self, stream: MessageStream, fake_consumer, mocker: MockFixture):
+        await stream.start()
+
+        fake_channel = CoroutineMock()
+        await stream.on_message(fake_channel, b'1', make_envelope(mocker, 1), None)
+        await stream.on_message(fake_channel, b'2', make_envelope(mocker, 2), None)
+        blocked = asyncio.ensure_future(stream.on_message(fake_channel, b'3', make_envelope(mocker, 3), None))
+        await asyncio.sleep(0)
+
+        await stream.close()
+        await blocked
+
+        assert [call[1] for call in fake_channel.basic_client_nack.call_args_list] == [
+            dict(delivery_tag=1, requeue=True),
+            dict(delivery_tag=2, requeue=True),
+            dict(delivery_tag=3, requeue=True),
+        ]
+        fake_consumer._streams.discard.assert_called_once_with(stream)
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_ok_requeue_after_close(self, stream: MessageStream, mocker: MockFixture):
+        await stream.start()
+        await stream.close()
+
+        fake_channel = CoroutineMock()
+        await stream.on_message(fake_channel, b'late', make_envelope(mocker, 1), None)
+
+        fake_channel.basic_client_nack.assert_called_once_with(delivery_tag=1, requeue=True)